@@ -9,15 +9,46 @@ This module provides a modular, maintainable approach to generating
 configuration files from templates with proper validation and deployment.
 """
 
+import asyncio
+import functools
+import hashlib
+import ipaddress
+import os
 import yaml
+import shlex
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, Template
+from jinja2 import (
+    Environment, FileSystemLoader, ChoiceLoader, ModuleLoader,
+    FileSystemBytecodeCache, Template
+)
 import logging
 
+# Prefer the libyaml C parser; identical results, much faster than pure Python
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None  # Fall back to subprocess ssh/scp
+
+# OpenSSH connection multiplexing: the first ssh to a node opens a master
+# connection that later ssh/scp calls reuse instead of re-handshaking
+try:
+    from .core import SSH_MUX_OPTS
+except ImportError:
+    # Run as a script: cluster_modules/ itself is on sys.path
+    from core import SSH_MUX_OPTS
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,10 +56,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Single-round-trip firewall detection used by the asyncssh code paths
+FIREWALL_DETECT_CMD = (
+    "if which firewall-cmd >/dev/null 2>&1; then echo firewalld; "
+    "elif which ufw >/dev/null 2>&1; then echo ufw; "
+    "else echo none; fi"
+)
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NodeConfig:
-    """Configuration for a single cluster node"""
+    """Configuration for a single cluster node (immutable)"""
     hostname: str
     ip: str
     cpus: int
@@ -40,7 +78,11 @@ class NodeConfig:
 
 @dataclass
 class ClusterConfig:
-    """Complete cluster configuration"""
+    """Complete cluster configuration
+    
+    Derived properties (all_nodes, all_ips, totals) are cached on first
+    access, so instances must not be mutated after construction.
+    """
     name: str
     master: NodeConfig
     workers: List[NodeConfig]
@@ -51,27 +93,147 @@ class ClusterConfig:
     oob_port_range: str = "50100-50200"
     ssh_key_path: Optional[str] = None
     
-    @property
+    @functools.cached_property
     def all_nodes(self) -> List[NodeConfig]:
         """Get all nodes (master + workers)"""
         return [self.master] + self.workers
     
-    @property
+    @functools.cached_property
     def all_ips(self) -> List[str]:
         """Get all node IPs"""
         return [node.ip for node in self.all_nodes]
     
-    @property
+    @functools.cached_property
+    def cluster_ips_cidr(self) -> str:
+        """Comma-separated /32 CIDR list of all node IPs"""
+        return ','.join(f"{ip}/32" for ip in self.all_ips)
+    
+    @functools.cached_property
     def total_cpus(self) -> int:
         """Total CPUs across cluster"""
         return sum(node.cpus for node in self.all_nodes)
     
-    @property
+    @functools.cached_property
     def total_memory_gb(self) -> int:
         """Total memory in GB across cluster"""
         return sum(node.memory_mb for node in self.all_nodes) // 1024
 
 
+# Jinja2 environments shared by all ConfigTemplateManager instances
+_ENV_CACHE: Dict[Path, Environment] = {}
+
+# Per-user cache for compiled templates (bytecode and precompiled archives)
+TEMPLATE_CACHE_DIR = Path.home() / ".cache" / "cluster_jinja"
+
+
+def compiled_templates_path(template_dir: Path) -> Path:
+    """Precompiled archive for a template directory
+    
+    Each directory gets its own archive, keyed by its resolved path, so a
+    custom template_dir is never served from another directory's archive.
+    """
+    key = hashlib.sha256(str(Path(template_dir).resolve()).encode()).hexdigest()[:16]
+    return TEMPLATE_CACHE_DIR / f"templates-{key}.zip"
+
+
+def _make_env(template_dir: Path, **options) -> Environment:
+    """Source-backed Jinja2 environment
+    
+    Compiled templates bake in these options, so the runtime environment
+    and precompile_templates() must both be built here.
+    """
+    return Environment(
+        loader=FileSystemLoader(str(template_dir)),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        **options
+    )
+
+
+def precompile_templates(template_dir: Path, target: Path, ignore_errors: bool = True) -> Path:
+    """Compile every .j2 template under template_dir into a zip archive
+    
+    The archive is loaded with ModuleLoader, so templates are imported as
+    Python modules without any lexing or parsing at render time. It is
+    written to a temporary file and moved into place with os.replace, so
+    a concurrent run never loads a half-written archive.
+    
+    Args:
+        template_dir: Directory containing the .j2 templates
+        target: Path of the zip archive to write
+        ignore_errors: Skip templates with syntax errors instead of raising
+    
+    Returns:
+        Path of the written archive
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.')
+    os.close(fd)
+    try:
+        _make_env(template_dir).compile_templates(
+            tmp_path, extensions=['j2'], zip='deflated', ignore_errors=ignore_errors
+        )
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return target
+
+
+def _use_compiled_templates(env: Environment, template_dir: Path, cache_zip: Path):
+    """Load templates from an ahead-of-time compiled archive
+    
+    Templates are compiled once into cache_zip and served through
+    ModuleLoader afterwards, so later runs skip lexing and parsing. The
+    archive is rebuilt whenever a template is newer than it; the source
+    FileSystemLoader stays behind it as a fallback.
+    """
+    source_loader = env.loader
+    
+    try:
+        newest = max(
+            (p.stat().st_mtime for p in template_dir.rglob('*.j2')),
+            default=0
+        )
+        if not cache_zip.exists() or cache_zip.stat().st_mtime < newest:
+            cache_zip.parent.mkdir(parents=True, exist_ok=True)
+            precompile_templates(template_dir, cache_zip)
+    except OSError as e:
+        logger.warning(f"Template precompilation skipped: {e}")
+        return
+    
+    env.loader = ChoiceLoader([
+        ModuleLoader(str(cache_zip)),
+        source_loader
+    ])
+
+
+def _get_jinja_env(template_dir: Path) -> Environment:
+    """Get the shared Jinja2 environment for a template directory
+    
+    The environment is built once per template_dir, so compiled templates
+    stay in its in-memory cache across manager instances. auto_reload is
+    off to avoid a stat() of the source file on every get_template().
+    """
+    template_dir = template_dir.resolve()
+    env = _ENV_CACHE.get(template_dir)
+    if env is None:
+        # Bytecode cached per user across CLI runs
+        TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        env = _make_env(
+            template_dir,
+            cache_size=400,
+            auto_reload=False,
+            bytecode_cache=FileSystemBytecodeCache(
+                directory=str(TEMPLATE_CACHE_DIR), pattern="%s.cache"
+            )
+        )
+        _use_compiled_templates(env, template_dir, compiled_templates_path(template_dir))
+        _ENV_CACHE[template_dir] = env
+    return env
+
+
 class ConfigTemplateManager:
     """Manages Jinja2 templates for configuration files"""
     
@@ -80,29 +242,38 @@ class ConfigTemplateManager:
         self.template_dir = template_dir or self.base_dir / "templates"
         self.config_file = self.base_dir / config_file
         
-        # Setup Jinja2 environment
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(str(self.template_dir)),
-            trim_blocks=True,
-            lstrip_blocks=True,
-            keep_trailing_newline=True
-        )
+        # Setup Jinja2 environment (shared per template dir)
+        self.jinja_env = _get_jinja_env(Path(self.template_dir))
+        
+        # asyncssh connection pool, kept open across deploy/firewall calls
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ssh_conns: Dict[str, Any] = {}
         
-        # Load cluster configuration
-        self.cluster_config = self._load_cluster_config()
+        # (template_path, frozen extra_context) -> rendered text
+        self._render_cache: Dict[tuple, str] = {}
+        
+        # One timestamp per generation run, shared by every rendered file
+        self._generation_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         logger.info(f"Initialized ConfigTemplateManager")
         logger.info(f"  Template dir: {self.template_dir}")
-        logger.info(f"  Cluster: {self.cluster_config.name}")
-        logger.info(f"  Nodes: {len(self.cluster_config.all_nodes)}")
+    
+    @functools.cached_property
+    def cluster_config(self) -> ClusterConfig:
+        """Cluster configuration, parsed from YAML on first access"""
+        cluster_config = self._load_cluster_config()
+        logger.info(f"  Cluster: {cluster_config.name}")
+        logger.info(f"  Nodes: {len(cluster_config.all_nodes)}")
+        return cluster_config
     
     def _load_cluster_config(self) -> ClusterConfig:
         """Load cluster configuration from YAML file"""
         if not self.config_file.exists():
             raise FileNotFoundError(f"Config file not found: {self.config_file}")
         
-        with open(self.config_file) as f:
-            config = yaml.safe_load(f)
+        # Binary mode lets libyaml decode UTF-8 itself (no Python text layer)
+        with open(self.config_file, 'rb') as f:
+            config = yaml.load(f, Loader=YamlLoader)
         
         # Parse master node (handle both dict and list formats)
         master_data = config['master']
@@ -123,7 +294,9 @@ class ConfigTemplateManager:
         workers = []
         for worker_data in config.get('workers', []):
             worker = NodeConfig(
-                hostname=worker_data.get('name', f"worker-{worker_data['ip'].split('.')[-1]}"),
+                hostname=worker_data.get(
+                    'name', f"worker-{ipaddress.ip_address(worker_data['ip']).packed[-1]}"
+                ),
                 ip=worker_data['ip'],
                 cpus=config.get('threads', {}).get(worker_data['ip'], 16),
                 memory_mb=32 * 1024,  # Default to 32GB
@@ -134,8 +307,7 @@ class ConfigTemplateManager:
             workers.append(worker)
         
         # Determine subnet from IPs
-        ip_parts = master.ip.split('.')
-        subnet = f"{ip_parts[0]}.{ip_parts[1]}.{ip_parts[2]}.0/24"
+        subnet = str(ipaddress.ip_network(f"{master.ip}/24", strict=False))
         
         return ClusterConfig(
             name="hpc_cluster",
@@ -144,10 +316,22 @@ class ConfigTemplateManager:
             subnet=subnet
         )
     
-    def _get_template_context(self) -> Dict[str, Any]:
-        """Get common template context variables"""
+    def warm_template_context(self) -> Dict[str, Any]:
+        """Build the shared template context now
+        
+        Call before rendering from several threads, so they all read the
+        cached context instead of each building its own copy.
+        
+        Returns:
+            Dict[str, Any]: The cached template context
+        """
+        return self._template_context
+    
+    @functools.cached_property
+    def _template_context(self) -> Dict[str, Any]:
+        """Common template context variables, built once per manager"""
         return {
-            'generation_timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'generation_timestamp': self._generation_timestamp,
             'cluster_name': self.cluster_config.name,
             'cluster_subnet': self.cluster_config.subnet,
             'cluster_ips': self.cluster_config.all_ips,
@@ -198,14 +382,29 @@ class ConfigTemplateManager:
         
         Returns:
             Rendered template content
+        
+        Output is cached per (template, extra_context), since the cluster
+        context and generation timestamp are fixed for the manager's lifetime.
         """
-        template = self.jinja_env.get_template(template_path)
-        context = self._get_template_context()
+        key = (template_path, tuple(sorted((extra_context or {}).items())))
+        try:
+            rendered = self._render_cache.get(key)
+        except TypeError:
+            # Unhashable extra_context values: render without caching
+            key, rendered = None, None
         
-        if extra_context:
-            context.update(extra_context)
+        if rendered is None:
+            template = self.jinja_env.get_template(template_path)
+            context = dict(self._template_context)
+            
+            if extra_context:
+                context.update(extra_context)
+            
+            rendered = template.render(**context)
+            if key is not None:
+                self._render_cache[key] = rendered
         
-        return template.render(**context)
+        return rendered
     
     def generate_mpi_mca_config(self, debug: bool = False, use_exact_ips: bool = True) -> str:
         """
@@ -215,13 +414,11 @@ class ConfigTemplateManager:
             debug: Enable verbose debugging
             use_exact_ips: Use exact IP list instead of subnet (recommended for multi-homed nodes)
         """
-        # Create CIDR-formatted IP list for exact IP matching
-        cluster_ips_cidr = ','.join(f"{ip}/32" for ip in self.cluster_config.all_ips)
-        
         return self.render_template('mpi/mca-params.conf.j2', {
             'enable_debug': debug,
             'use_exact_ips': use_exact_ips,
-            'cluster_ips_cidr': cluster_ips_cidr
+            # CIDR-formatted IP list for exact IP matching
+            'cluster_ips_cidr': self.cluster_config.cluster_ips_cidr
         })
     
     def generate_mpi_hostfile(self, slots_mode: str = 'max', output_filename: str = 'hostfile') -> str:
@@ -252,6 +449,147 @@ class ConfigTemplateManager:
             'log_dir': '/var/log/slurm'
         })
     
+    def _find_node(self, node_ip: str) -> Optional[NodeConfig]:
+        """Look up a node in the cluster config by IP"""
+        for node in self.cluster_config.all_nodes:
+            if node.ip == node_ip:
+                return node
+        return None
+    
+    def _run_async(self, coro):
+        """Run a coroutine on the manager's own event loop
+        
+        asyncssh connections are bound to the loop that opened them, so a
+        single long-lived loop (instead of asyncio.run per call) lets pooled
+        connections be reused by later operations.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+    
+    async def _get_connection(self, node_ip: str):
+        """Get the pooled asyncssh connection for a node, opening it if needed"""
+        conn = self._ssh_conns.get(node_ip)
+        if conn is None:
+            node = self._find_node(node_ip)
+            conn = await asyncssh.connect(
+                node_ip,
+                username=node.username if node else None,
+                connect_timeout=10
+            )
+            self._ssh_conns[node_ip] = conn
+        return conn
+    
+    def close(self):
+        """Close pooled SSH connections and the event loop"""
+        if self._loop is None:
+            return
+        
+        async def _close_all():
+            for conn in self._ssh_conns.values():
+                conn.close()
+            await asyncio.gather(
+                *(conn.wait_closed() for conn in self._ssh_conns.values()),
+                return_exceptions=True
+            )
+        
+        self._loop.run_until_complete(_close_all())
+        self._ssh_conns.clear()
+        self._loop.close()
+        self._loop = None
+    
+    @staticmethod
+    async def _gather_nodes(coro_fn, nodes: List[str], *args) -> list:
+        """Run an async per-node operation on all nodes concurrently"""
+        return await asyncio.gather(*(coro_fn(node_ip, *args) for node_ip in nodes))
+    
+    @staticmethod
+    def _remote_prepare_cmd(remote_path: str, backup: bool) -> str:
+        """Shell command that creates the target dir and optionally backs up the file"""
+        command = f"mkdir -p {Path(remote_path).parent}"
+        if backup:
+            command += f" && {{ cp {remote_path} {remote_path}.backup 2>/dev/null || true; }}"
+        return command
+    
+    async def _deploy_one_async(
+        self,
+        node_ip: str,
+        content: str,
+        remote_path: str,
+        backup: bool
+    ) -> bool:
+        """Deploy content to one node over its pooled asyncssh connection"""
+        command = self._remote_prepare_cmd(remote_path, backup) + f" && cat > {remote_path}"
+        
+        try:
+            conn = await self._get_connection(node_ip)
+            result = await asyncio.wait_for(conn.run(command, input=content), timeout=15)
+            if result.exit_status == 0:
+                logger.info(f"✓ Deployed to {node_ip}")
+                return True
+            logger.error(f"✗ {node_ip} - error: {(result.stderr or '').strip()}")
+        except asyncio.TimeoutError:
+            logger.error(f"✗ {node_ip} - timeout")
+        except (OSError, asyncssh.Error) as e:
+            logger.error(f"✗ {node_ip} - error: {e}")
+        return False
+    
+    def _deploy_one(
+        self,
+        node_ip: str,
+        temp_file: Path,
+        remote_path: str,
+        backup: bool,
+        use_rsync: bool = False
+    ) -> tuple[str, bool]:
+        """Deploy a staged config file to a single node (mkdir, backup, scp)
+        
+        With use_rsync the whole sequence is one rsync process: the remote
+        rsync is started after a mkdir -p of the directory (--mkpath needs
+        rsync 3.2.3 or later) and --backup keeps the previous file.
+        """
+        try:
+            if use_rsync:
+                backup_opts = ["--backup", "--suffix=.backup"] if backup else []
+                subprocess.run(
+                    ["rsync", *backup_opts,
+                     "--rsync-path", f"mkdir -p {shlex.quote(str(Path(remote_path).parent))} && rsync",
+                     "-e", " ".join(("ssh",) + SSH_MUX_OPTS),
+                     str(temp_file), f"{node_ip}:{remote_path}"],
+                    check=True,
+                    timeout=15,
+                    capture_output=True
+                )
+                logger.info(f"✓ Deployed to {node_ip}")
+                return node_ip, True
+            
+            # Create directory and backup existing file in one round trip
+            prepare_cmd = self._remote_prepare_cmd(remote_path, backup)
+            subprocess.run(
+                ["ssh", *SSH_MUX_OPTS, node_ip, prepare_cmd],
+                check=True,
+                timeout=10,
+                capture_output=True
+            )
+            
+            # Copy new config over the multiplexed connection
+            subprocess.run(
+                ["scp", *SSH_MUX_OPTS, str(temp_file), f"{node_ip}:{remote_path}"],
+                check=True,
+                timeout=15,
+                capture_output=True
+            )
+            
+            logger.info(f"✓ Deployed to {node_ip}")
+            return node_ip, True
+            
+        except subprocess.TimeoutExpired:
+            logger.error(f"✗ {node_ip} - timeout")
+        except subprocess.CalledProcessError as e:
+            logger.error(f"✗ {node_ip} - error: {e}")
+        
+        return node_ip, False
+    
     def deploy_config_to_nodes(
         self,
         content: str,
@@ -274,53 +612,41 @@ class ConfigTemplateManager:
         if nodes is None:
             nodes = self.cluster_config.all_ips
         
-        # Write to temporary file
-        temp_file = Path('/tmp/config_deploy.tmp')
-        temp_file.write_text(content)
+        if asyncssh is not None:
+            outcomes = self._run_async(self._gather_nodes(
+                self._deploy_one_async, nodes, content, remote_path, backup
+            ))
+            return dict(zip(nodes, outcomes))
+        
+        # Write to a private temporary file, in RAM-backed /dev/shm when present
+        with tempfile.NamedTemporaryFile(
+            dir='/dev/shm' if Path('/dev/shm').is_dir() else None,
+            prefix='config_deploy_',
+            suffix='.conf',
+            delete=False
+        ) as tf:
+            tf.write(content.encode())
+        temp_file = Path(tf.name)
+        # scp/rsync carry the source mode over to new remote files
+        os.chmod(temp_file, 0o644)
+        
+        use_rsync = shutil.which('rsync') is not None
         
         results = {}
-        for node_ip in nodes:
-            try:
-                # Create directory if needed
-                remote_dir = Path(remote_path).parent
-                subprocess.run(
-                    f"ssh {node_ip} 'mkdir -p {remote_dir}'",
-                    shell=True,
-                    check=True,
-                    timeout=10,
-                    capture_output=True
-                )
-                
-                # Backup existing file
-                if backup:
-                    subprocess.run(
-                        f"ssh {node_ip} 'cp {remote_path} {remote_path}.backup 2>/dev/null || true'",
-                        shell=True,
-                        timeout=10,
-                        capture_output=True
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(nodes))) as executor:
+                futures = [
+                    executor.submit(
+                        self._deploy_one, node_ip, temp_file, remote_path, backup, use_rsync
                     )
-                
-                # Copy new config
-                subprocess.run(
-                    f"scp {temp_file} {node_ip}:{remote_path}",
-                    shell=True,
-                    check=True,
-                    timeout=15,
-                    capture_output=True
-                )
-                
-                results[node_ip] = True
-                logger.info(f"✓ Deployed to {node_ip}")
-                
-            except subprocess.TimeoutExpired:
-                results[node_ip] = False
-                logger.error(f"✗ {node_ip} - timeout")
-            except subprocess.CalledProcessError as e:
-                results[node_ip] = False
-                logger.error(f"✗ {node_ip} - error: {e}")
-        
-        # Cleanup
-        temp_file.unlink(missing_ok=True)
+                    for node_ip in nodes
+                ]
+                for future in as_completed(futures):
+                    node_ip, success = future.result()
+                    results[node_ip] = success
+        finally:
+            # Cleanup
+            temp_file.unlink(missing_ok=True)
         
         return results
     
@@ -342,14 +668,7 @@ class ConfigTemplateManager:
             Tuple of (success, message)
         """
         # Get node info to determine OS
-        node = None
-        if node_ip == self.cluster_config.master.ip:
-            node = self.cluster_config.master
-        else:
-            for worker in self.cluster_config.workers:
-                if worker.ip == node_ip:
-                    node = worker
-                    break
+        node = self._find_node(node_ip)
         
         if not node:
             return False, f"Node {node_ip} not found in cluster config"
@@ -359,10 +678,9 @@ class ConfigTemplateManager:
         try:
             # Detect firewall type on the node
             # Try firewalld first
-            detect_cmd = f"ssh {node_ip} 'which firewall-cmd >/dev/null 2>&1 && echo firewalld || true'"
+            detect_cmd = ["ssh", node_ip, "which firewall-cmd >/dev/null 2>&1 && echo firewalld || true"]
             result = subprocess.run(
                 detect_cmd,
-                shell=True,
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -371,10 +689,9 @@ class ConfigTemplateManager:
             
             # If not firewalld, try ufw
             if not firewall_type:
-                detect_cmd = f"ssh {node_ip} 'which ufw >/dev/null 2>&1 && echo ufw || true'"
+                detect_cmd = ["ssh", node_ip, "which ufw >/dev/null 2>&1 && echo ufw || true"]
                 result = subprocess.run(
                     detect_cmd,
-                    shell=True,
                     capture_output=True,
                     text=True,
                     timeout=10
@@ -387,14 +704,14 @@ class ConfigTemplateManager:
             
             if firewall_type == "firewalld":
                 # RedHat/Rocky/CentOS with firewalld
-                cmd = f"ssh {node_ip} 'sudo firewall-cmd --permanent --add-port={ports}/{protocol} && sudo firewall-cmd --reload'"
-                subprocess.run(cmd, shell=True, check=True, timeout=15, capture_output=True)
+                cmd = ["ssh", node_ip, f"sudo firewall-cmd --permanent --add-port={ports}/{protocol} && sudo firewall-cmd --reload"]
+                subprocess.run(cmd, check=True, timeout=15, capture_output=True)
                 return True, f"✓ firewalld configured on {node.hostname}"
                 
             elif firewall_type == "ufw":
                 # Ubuntu with ufw
-                cmd = f"ssh {node_ip} 'sudo ufw allow {ports}/{protocol} && sudo ufw status | grep -q inactive || sudo ufw reload'"
-                subprocess.run(cmd, shell=True, check=True, timeout=15, capture_output=True)
+                cmd = ["ssh", node_ip, f"sudo ufw allow {ports}/{protocol} && sudo ufw status | grep -q inactive || sudo ufw reload"]
+                subprocess.run(cmd, check=True, timeout=15, capture_output=True)
                 return True, f"✓ ufw configured on {node.hostname}"
                 
             elif firewall_type == "none":
@@ -409,6 +726,43 @@ class ConfigTemplateManager:
         except subprocess.CalledProcessError as e:
             return False, f"✗ Error configuring firewall on {node.hostname}: {e}"
     
+    async def _configure_firewall_node_async(
+        self,
+        node_ip: str,
+        ports: str,
+        protocol: str
+    ) -> tuple[bool, str]:
+        """asyncssh variant of configure_firewall_node (pooled connection per node)"""
+        node = self._find_node(node_ip)
+        if not node:
+            return False, f"Node {node_ip} not found in cluster config"
+        
+        try:
+            conn = await self._get_connection(node_ip)
+            detect = await asyncio.wait_for(conn.run(FIREWALL_DETECT_CMD), timeout=10)
+            firewall_type = detect.stdout.strip()
+            
+            if firewall_type == "firewalld":
+                cmd = f"sudo firewall-cmd --permanent --add-port={ports}/{protocol} && sudo firewall-cmd --reload"
+                message = f"✓ firewalld configured on {node.hostname}"
+            elif firewall_type == "ufw":
+                cmd = f"sudo ufw allow {ports}/{protocol} && sudo ufw status | grep -q inactive || sudo ufw reload"
+                message = f"✓ ufw configured on {node.hostname}"
+            elif firewall_type == "none":
+                return True, f"⚠ No firewall detected on {node.hostname} - ports may already be open"
+            else:
+                return False, f"✗ Unknown firewall type on {node.hostname}: {firewall_type}"
+            
+            result = await asyncio.wait_for(conn.run(cmd), timeout=15)
+            if result.exit_status != 0:
+                return False, f"✗ Error configuring firewall on {node.hostname}: {(result.stderr or '').strip()}"
+            return True, message
+                
+        except asyncio.TimeoutError:
+            return False, f"✗ Timeout configuring firewall on {node.hostname}"
+        except (OSError, asyncssh.Error) as e:
+            return False, f"✗ Error configuring firewall on {node.hostname}: {e}"
+    
     def configure_all_firewalls(
         self,
         ports: str = "50000-50200",
@@ -431,9 +785,15 @@ class ConfigTemplateManager:
         
         logger.info(f"Configuring firewalls for ports {ports}/{protocol} on {len(nodes)} nodes...")
         
+        if asyncssh is not None:
+            outcomes = self._run_async(self._gather_nodes(
+                self._configure_firewall_node_async, nodes, ports, protocol
+            ))
+        else:
+            outcomes = [self.configure_firewall_node(node_ip, ports, protocol) for node_ip in nodes]
+        
         results = {}
-        for node_ip in nodes:
-            success, message = self.configure_firewall_node(node_ip, ports, protocol)
+        for node_ip, (success, message) in zip(nodes, outcomes):
             results[node_ip] = (success, message)
             if success:
                 logger.info(message)
@@ -446,6 +806,27 @@ class ConfigTemplateManager:
         
         return results
     
+    async def _verify_firewall_node_async(self, node_ip: str) -> str:
+        """asyncssh variant of the per-node check in verify_firewall_config"""
+        try:
+            conn = await self._get_connection(node_ip)
+            detect = await asyncio.wait_for(conn.run(FIREWALL_DETECT_CMD), timeout=10)
+            firewall_type = detect.stdout.strip()
+            
+            if firewall_type == "firewalld":
+                result = await asyncio.wait_for(conn.run("sudo firewall-cmd --list-ports"), timeout=10)
+                return f"firewalld: {result.stdout.strip()}"
+            elif firewall_type == "ufw":
+                result = await asyncio.wait_for(conn.run("sudo ufw status | grep 50000:50200"), timeout=10)
+                return f"ufw: {result.stdout.strip() if result.exit_status == 0 else 'ports not found'}"
+            else:
+                return "No firewall detected"
+                    
+        except asyncio.TimeoutError:
+            return "Timeout"
+        except Exception as e:
+            return f"Error: {e}"
+    
     def verify_firewall_config(self, nodes: List[str] = None) -> Dict[str, str]:
         """
         Verify firewall configuration on cluster nodes
@@ -461,15 +842,18 @@ class ConfigTemplateManager:
         
         logger.info(f"Verifying firewall configuration on {len(nodes)} nodes...")
         
+        if asyncssh is not None:
+            statuses = self._run_async(self._gather_nodes(self._verify_firewall_node_async, nodes))
+            return dict(zip(nodes, statuses))
+        
         results = {}
         for node_ip in nodes:
             try:
                 # Try to detect firewall type
                 # Try firewalld first
-                detect_cmd = f"ssh {node_ip} 'which firewall-cmd >/dev/null 2>&1 && echo firewalld || true'"
+                detect_cmd = ["ssh", node_ip, "which firewall-cmd >/dev/null 2>&1 && echo firewalld || true"]
                 detect_result = subprocess.run(
                     detect_cmd,
-                    shell=True,
                     capture_output=True,
                     text=True,
                     timeout=10
@@ -478,10 +862,9 @@ class ConfigTemplateManager:
                 
                 # If not firewalld, try ufw
                 if not firewall_type:
-                    detect_cmd = f"ssh {node_ip} 'which ufw >/dev/null 2>&1 && echo ufw || true'"
+                    detect_cmd = ["ssh", node_ip, "which ufw >/dev/null 2>&1 && echo ufw || true"]
                     detect_result = subprocess.run(
                         detect_cmd,
-                        shell=True,
                         capture_output=True,
                         text=True,
                         timeout=10
@@ -493,14 +876,14 @@ class ConfigTemplateManager:
                 
                 if firewall_type == "firewalld":
                     # Check firewalld rules
-                    cmd = f"ssh {node_ip} 'sudo firewall-cmd --list-ports'"
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+                    cmd = ["ssh", node_ip, "sudo firewall-cmd --list-ports"]
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
                     results[node_ip] = f"firewalld: {result.stdout.strip()}"
                     
                 elif firewall_type == "ufw":
                     # Check ufw status
-                    cmd = f"ssh {node_ip} 'sudo ufw status | grep 50000:50200'"
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+                    cmd = ["ssh", node_ip, "sudo ufw status | grep 50000:50200"]
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
                     results[node_ip] = f"ufw: {result.stdout.strip() if result.returncode == 0 else 'ports not found'}"
                     
                 else:
@@ -571,8 +954,24 @@ def main():
     # Summary command
     subparsers.add_parser('summary', help='Print cluster configuration summary')
     
+    # Precompile command
+    precompile_parser = subparsers.add_parser(
+        'precompile', help='Compile templates ahead of time for faster CLI startup'
+    )
+    precompile_parser.add_argument('--template-dir', help='Template directory (default: templates/)')
+    precompile_parser.add_argument('--target', help=f'Output archive (default: per-directory archive in {TEMPLATE_CACHE_DIR})')
+    
     args = parser.parse_args()
     
+    if args.command == 'precompile':
+        base_dir = Path(__file__).parent.parent
+        template_dir = Path(args.template_dir) if args.template_dir else base_dir / "templates"
+        target = Path(args.target) if args.target else compiled_templates_path(template_dir)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target = precompile_templates(template_dir, target, ignore_errors=False)
+        print(f"Precompiled templates: {target}")
+        return
+    
     # Initialize manager
     manager = ConfigTemplateManager(config_file=args.config)
     
@@ -580,6 +979,10 @@ def main():
         manager.print_summary()
     
     elif args.command == 'generate':
+        if args.type == 'all':
+            # Load the cluster context once for all four renders
+            manager.warm_template_context()
+        
         if args.type in ['mpi-mca', 'all']:
             content = manager.generate_mpi_mca_config(debug=args.debug)
             if args.output:
@@ -667,6 +1070,8 @@ def main():
                 print(f"{hostname} ({node_ip}):")
                 print(f"  {status}")
             print("=" * 70)
+    
+    manager.close()
 
 
 if __name__ == '__main__':
@@ -8,12 +8,302 @@ Provides:
 - Package manager detection
 """
 
+import functools
 import subprocess
 import os
+import re
 import socket
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Union
+
+
+# Reuse one SSH connection per node across consecutive remote commands
+SSH_MUX_OPTS = (
+    "-o", "ControlMaster=auto",
+    "-o", "ControlPersist=60s",
+    "-o", "ControlPath=~/.ssh/cm-%r@%h:%p",
+)
+
+# Upper bound on concurrent ssh processes during a cluster-wide fan-out
+MAX_SSH_FANOUT = 64
+
+# Probe that succeeds only if key (or agent) authentication works. It never
+# reuses a multiplexed master, which may have been opened with a password.
+_SSH_KEY_PROBE_OPTS = (
+    "-o", "BatchMode=yes",
+    "-o", "ConnectTimeout=10",
+    "-o", "StrictHostKeyChecking=no",
+    "-o", "ControlMaster=no",
+    "-o", "ControlPath=none",
+)
+
+# Appends the key read from stdin to authorized_keys unless already there
+_AUTHORIZE_KEY_SCRIPT = (
+    'umask 077 && mkdir -p ~/.ssh && key=$(cat) && '
+    '{ grep -qxF "$key" ~/.ssh/authorized_keys 2>/dev/null || '
+    'echo "$key" >> ~/.ssh/authorized_keys; }'
+)
+
+# (username, node_ip) pairs known to accept this user's SSH key
+_key_auth_nodes = set()
+
+# IPv4 addresses in `ip addr` output (bytes, so the output is never decoded)
+_INET_RE = re.compile(rb'inet\s+(\d+\.\d+\.\d+\.\d+)')
+
+_PKG_MANAGERS = {'redhat': 'dnf', 'ubuntu': 'apt-get'}
+
+
+# Host facts below cannot change during a run, so each is computed once per
+# process and shared by every ClusterCore instance.
+
+@functools.lru_cache(maxsize=1)
+def _detect_os_type() -> str:
+    """Detect operating system type from /etc/os-release"""
+    try:
+        if os.path.exists('/etc/os-release'):
+            with open('/etc/os-release', 'r') as f:
+                content = f.read().lower()
+                if 'red hat' in content or 'rhel' in content or \
+                   'fedora' in content or 'centos' in content:
+                    return 'redhat'
+                elif 'ubuntu' in content or 'debian' in content:
+                    return 'ubuntu'
+        
+        # Fallback: check for package managers
+        if shutil.which('dnf'):
+            return 'redhat'
+        elif shutil.which('apt-get'):
+            return 'ubuntu'
+    except Exception as e:
+        print(f"DEBUG: Error detecting OS: {e}")
+    
+    return 'ubuntu'  # Default
+
+
+@functools.lru_cache(maxsize=1)
+def _running_on_wsl() -> bool:
+    """Check /proc/version for a WSL kernel"""
+    try:
+        with open('/proc/version', 'r') as f:
+            version = f.read().lower()
+            return 'microsoft' in version or 'wsl' in version
+    except:
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def _read_local_ips() -> Tuple[str, ...]:
+    """All IPv4 addresses on local interfaces, via `ip addr`"""
+    try:
+        result = subprocess.run(['ip', 'addr'], capture_output=True,
+                               check=False)
+        if result.returncode == 0:
+            return tuple(ip.decode() for ip in _INET_RE.findall(result.stdout))
+    except:
+        pass
+    
+    return ()
+
+
+def _local_public_key() -> Optional[str]:
+    """This user's RSA public key, generating the key pair if needed"""
+    ssh_dir = Path.home() / ".ssh"
+    pub_key_path = ssh_dir / "id_rsa.pub"
+    
+    if not pub_key_path.exists():
+        ssh_dir.mkdir(mode=0o700, exist_ok=True)
+        result = subprocess.run(
+            ['ssh-keygen', '-q', '-t', 'rsa', '-b', '4096',
+             '-f', str(ssh_dir / "id_rsa"), '-N', ''],
+            capture_output=True, check=False
+        )
+        if result.returncode != 0:
+            return None
+    
+    return pub_key_path.read_text().strip()
+
+
+def _ssh_key_works(username: str, node_ip: str) -> bool:
+    """Check that a node accepts key authentication, without a password"""
+    try:
+        result = subprocess.run(
+            ['ssh', *_SSH_KEY_PROBE_OPTS, f"{username}@{node_ip}", 'true'],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=30
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+    return result.returncode == 0
+
+
+def setup_ssh_keys(username: str, password: Optional[str], nodes: List[str]) -> List[str]:
+    """Make sure the nodes accept this user's SSH key
+    
+    Each node is probed with key authentication; where that fails the
+    public key is pushed once over a password (sshpass) connection. Results
+    are remembered for the rest of the process, so calling this again only
+    touches nodes that have not been set up yet.
+    
+    Args:
+        username: SSH username on the nodes
+        password: Password for the one-time key push (None to only probe)
+        nodes: Node IPs to set up
+        
+    Returns:
+        Node IPs that still need password authentication
+    """
+    pending = [ip for ip in nodes if (username, ip) not in _key_auth_nodes]
+    if not pending:
+        return []
+    
+    pub_key = _local_public_key() if password else None
+    
+    def bootstrap(node_ip: str) -> bool:
+        if _ssh_key_works(username, node_ip):
+            return True
+        if pub_key is None:
+            return False
+        
+        push_cmd = [
+            'sshpass', '-p', password,
+            'ssh', '-o', 'StrictHostKeyChecking=no',
+            f"{username}@{node_ip}", _AUTHORIZE_KEY_SCRIPT
+        ]
+        try:
+            result = subprocess.run(push_cmd, input=pub_key + '\n',
+                                    capture_output=True, text=True, timeout=60)
+        except (subprocess.TimeoutExpired, OSError):
+            return False
+        return result.returncode == 0 and _ssh_key_works(username, node_ip)
+    
+    with ThreadPoolExecutor(max_workers=min(len(pending), MAX_SSH_FANOUT)) as executor:
+        outcomes = list(executor.map(bootstrap, pending))
+    
+    needs_password = []
+    for node_ip, key_ok in zip(pending, outcomes):
+        if key_ok:
+            _key_auth_nodes.add((username, node_ip))
+        else:
+            needs_password.append(node_ip)
+    return needs_password
+
+
+def ssh_password_prefix(username: str, password: Optional[str], node_ip: str) -> List[str]:
+    """argv prefix for an ssh command to a node
+    
+    Empty once setup_ssh_keys has confirmed key authentication for the node
+    (or when there is no password), otherwise the sshpass wrapper.
+    """
+    if not password or (username, node_ip) in _key_auth_nodes:
+        return []
+    return ['sshpass', '-p', password]
+
+
+def pdsh_env() -> Dict[str, str]:
+    """Environment for pdsh with SSH connection multiplexing enabled"""
+    env = os.environ.copy()
+    ssh_args = env.get('PDSH_SSH_ARGS_APPEND', '')
+    env['PDSH_SSH_ARGS_APPEND'] = f"{ssh_args} {' '.join(SSH_MUX_OPTS)}".strip()
+    return env
+
+
+class RemoteNodeMixin:
+    """SSH helpers shared by the cluster managers
+    
+    Expects the manager to define username, password, master_ip and
+    all_ips.
+    """
+    
+    @functools.cached_property
+    def _local_ip(self) -> str:
+        """This node's cluster IP, resolved once per manager"""
+        # Hostname resolution first: no subprocess needed when it works
+        try:
+            for ip in socket.gethostbyname_ex(socket.gethostname())[2]:
+                if ip in self.all_ips:
+                    return ip
+        except OSError:
+            pass
+        
+        try:
+            # Fall back to the addresses of all interfaces
+            hostname_result = subprocess.run(["hostname", "-I"], capture_output=True, text=True)
+            if hostname_result.returncode == 0:
+                for ip in hostname_result.stdout.split():
+                    if ip in self.all_ips:
+                        return ip
+        except Exception:
+            pass
+        
+        # Default to master if can't determine
+        return self.master_ip
+    
+    def _get_local_ip(self) -> Optional[str]:
+        """
+        Get local node IP address.
+        
+        Returns:
+            Optional[str]: Local IP address or None if not found
+        """
+        return self._local_ip
+    
+    def setup_ssh_keys(self, nodes: Optional[List[str]] = None) -> bool:
+        """
+        Switch cluster nodes to SSH key authentication.
+        
+        The public key is pushed with the password once; afterwards ssh to
+        those nodes runs without the sshpass wrapper, which also keeps the
+        password off the command line. Nodes already set up in this
+        process are not contacted again.
+        
+        Args:
+            nodes: Node IPs to set up (default: every node but this one)
+            
+        Returns:
+            bool: True if every node accepts key authentication
+        """
+        if nodes is None:
+            nodes = [ip for ip in self.all_ips if ip != self._local_ip]
+        
+        needs_password = setup_ssh_keys(self.username, self.password, nodes)
+        for node_ip in needs_password:
+            print(f"⚠ SSH key authentication unavailable on {node_ip}, using password")
+        return not needs_password
+    
+    def _ssh_transport(self, node_ip: str) -> List[str]:
+        """
+        ssh argv (without destination) for a node, also usable as rsync -e.
+        
+        Connections are multiplexed, so consecutive commands to the same
+        node reuse one authenticated session. Nodes set up by
+        setup_ssh_keys use key authentication in batch mode; only the
+        others get the sshpass wrapper.
+        
+        Args:
+            node_ip: IP address of the remote node
+            
+        Returns:
+            List[str]: argv prefix
+        """
+        password_prefix = ssh_password_prefix(self.username, self.password, node_ip)
+        transport = ["ssh", "-o", "StrictHostKeyChecking=no", *SSH_MUX_OPTS]
+        if not password_prefix:
+            transport += ["-o", "BatchMode=yes"]
+        return password_prefix + transport
+    
+    def _ssh_command(self, node_ip: str, remote_cmd: str) -> List[str]:
+        """
+        Build the ssh argv for running a command on a cluster node.
+        
+        Args:
+            node_ip: IP address of the remote node
+            remote_cmd: Command string for the remote shell
+            
+        Returns:
+            List[str]: argv suitable for subprocess
+        """
+        return [*self._ssh_transport(node_ip), f"{self.username}@{node_ip}", remote_cmd]
 
 
 class ClusterCore:
@@ -36,44 +326,21 @@ class ClusterCore:
         self.username = username or os.getenv('USER', 'ubuntu')
         self.password = password
         self.os_type = self._detect_os()
-        self.pkg_manager = 'dnf' if self.os_type == 'redhat' else 'apt-get'
+        self.pkg_manager = _PKG_MANAGERS.get(self.os_type, 'apt-get')
         self.is_master = self._is_current_node_master()
         self.master_hostname = self._get_master_hostname()
     
     def _detect_os(self) -> str:
-        """Detect operating system type
+        """Detect operating system type (cached per process)
         
         Returns:
             'ubuntu' for Debian/Ubuntu, 'redhat' for RHEL/Fedora/CentOS
         """
-        try:
-            if os.path.exists('/etc/os-release'):
-                with open('/etc/os-release', 'r') as f:
-                    content = f.read().lower()
-                    if 'red hat' in content or 'rhel' in content or \
-                       'fedora' in content or 'centos' in content:
-                        return 'redhat'
-                    elif 'ubuntu' in content or 'debian' in content:
-                        return 'ubuntu'
-            
-            # Fallback: check for package managers
-            if shutil.which('dnf'):
-                return 'redhat'
-            elif shutil.which('apt-get'):
-                return 'ubuntu'
-        except Exception as e:
-            print(f"DEBUG: Error detecting OS: {e}")
-        
-        return 'ubuntu'  # Default
+        return _detect_os_type()
     
     def _is_wsl(self) -> bool:
         """Check if running on Windows Subsystem for Linux"""
-        try:
-            with open('/proc/version', 'r') as f:
-                version = f.read().lower()
-                return 'microsoft' in version or 'wsl' in version
-        except:
-            return False
+        return _running_on_wsl()
     
     def _is_current_node_master(self) -> bool:
         """Check if current node is the master node"""
@@ -86,15 +353,7 @@ class ClusterCore:
                 return True
             
             # Check all network interfaces
-            result = subprocess.run(['ip', 'addr'], capture_output=True, 
-                                   text=True, check=False)
-            if result.returncode == 0:
-                import re
-                local_ips = re.findall(r'inet\s+(\d+\.\d+\.\d+\.\d+)', result.stdout)
-                if self.master_ip in local_ips:
-                    return True
-            
-            return False
+            return self.master_ip in self.get_local_ips()
         except Exception as e:
             print(f"DEBUG: Error detecting if master: {e}")
             return False
@@ -124,26 +383,19 @@ class ClusterCore:
     def get_local_ips(self) -> List[str]:
         """Get all local IP addresses of current node
         
+        The `ip addr` lookup runs once per process and is cached.
+        
         Returns:
             List of IP addresses
         """
-        try:
-            result = subprocess.run(['ip', 'addr'], capture_output=True,
-                                   text=True, check=False)
-            if result.returncode == 0:
-                import re
-                return re.findall(r'inet\s+(\d+\.\d+\.\d+\.\d+)', result.stdout)
-        except:
-            pass
-        
-        return []
+        return list(_read_local_ips())
     
-    def run_command(self, command: str, check: bool = True, 
+    def run_command(self, command: Union[str, List[str]], check: bool = True, 
                    shell: bool = True) -> subprocess.CompletedProcess:
         """Execute command locally
         
         Args:
-            command: Shell command to execute
+            command: Shell command string, or argv list when shell=False
             check: Raise exception on non-zero exit code
             shell: Execute through shell
             
@@ -182,31 +434,19 @@ class ClusterCore:
         if self.password:
             # Use sudo -S to read password from stdin
             sudo_cmd = f"sudo -S {command}"
-            process = subprocess.Popen(
-                sudo_cmd,
-                shell=True,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            stdout, stderr = process.communicate(input=f"{self.password}\n")
-            
-            result = subprocess.CompletedProcess(
-                args=sudo_cmd,
-                returncode=process.returncode,
-                stdout=stdout,
-                stderr=stderr
-            )
-            
-            if check and result.returncode != 0:
-                print(f"Error executing: {sudo_cmd}")
-                print(f"Error output: {stderr}")
-                raise subprocess.CalledProcessError(
-                    result.returncode, sudo_cmd, stdout, stderr
+            try:
+                return subprocess.run(
+                    sudo_cmd,
+                    shell=True,
+                    input=f"{self.password}\n",
+                    capture_output=True,
+                    text=True,
+                    check=check
                 )
-            
-            return result
+            except subprocess.CalledProcessError as e:
+                print(f"Error executing: {sudo_cmd}")
+                print(f"Error output: {e.stderr}")
+                raise
         else:
             # Try without password (may prompt user)
             if 'SUDO_ASKPASS' in os.environ and os.path.exists(os.environ['SUDO_ASKPASS']):
@@ -226,15 +466,15 @@ class ClusterCore:
         Returns:
             CompletedProcess instance
         """
-        if self.password:
-            ssh_cmd = (
-                f"sshpass -p '{self.password}' ssh -o StrictHostKeyChecking=no "
-                f"{self.username}@{node_ip} '{command}'"
-            )
-        else:
-            ssh_cmd = f"ssh -o StrictHostKeyChecking=no {self.username}@{node_ip} '{command}'"
+        # argv list: no local shell, and the command reaches the remote
+        # shell verbatim instead of being re-quoted locally
+        ssh_cmd = [
+            *ssh_password_prefix(self.username, self.password, node_ip),
+            'ssh', '-o', 'StrictHostKeyChecking=no', *SSH_MUX_OPTS,
+            f"{self.username}@{node_ip}", command
+        ]
         
-        return self.run_command(ssh_cmd, check=check)
+        return self.run_command(ssh_cmd, check=check, shell=False)
     
     def run_remote_sudo_command(self, node_ip: str, command: str,
                                check: bool = True) -> subprocess.CompletedProcess:
@@ -9,9 +9,36 @@ Date: November 4, 2025
 """
 
 import os
+import re
+import shlex
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, List
+
+from .core import MAX_SSH_FANOUT, SSH_MUX_OPTS, ssh_password_prefix
+from .installer_base import update_bashrc
+
+
+# Versioned GCC driver in the Homebrew bin directory, e.g. gcc-15
+_GCC_VERSIONED_RE = re.compile(r'gcc-(\d+)$')
+
+# Active (uncommented) PermitUserEnvironment yes line in sshd configuration
+_PERMIT_USER_ENV_RE = re.compile(r'^\s*PermitUserEnvironment\s+yes\b', re.MULTILINE | re.IGNORECASE)
+
+# Upper bound for one worker's setup; a fresh Homebrew plus GCC install
+# can take the better part of an hour on a slow node
+REMOTE_SETUP_TIMEOUT = 3600
+
+# sed expression commenting out active PermitUserEnvironment lines
+_SSHD_DISABLE_PERMIT_USER_ENV = r's/^[[:space:]]*PermitUserEnvironment[[:space:]]/# &/I'
+
+# Identifies the Homebrew environment block in ~/.bashrc
+BASHRC_MARKER = "# CLUSTER_HOMEBREW_V1"
+
+# Written to ~/.bashrc once the local setup has completed successfully
+SETUP_MARKER = "# CLUSTER_HOMEBREW_SETUP_V1"
 
 
 class HomebrewManager:
@@ -34,6 +61,7 @@ class HomebrewManager:
         self.worker_ips = worker_ips or []
         self.homebrew_bin = "/home/linuxbrew/.linuxbrew/bin"
         self.homebrew_opt = "/home/linuxbrew/.linuxbrew/opt"
+        self._installed_formulae: Optional[Dict[str, str]] = None
     
     def _run_command(self, command: str, check: bool = True) -> subprocess.CompletedProcess:
         """Execute a shell command"""
@@ -50,10 +78,35 @@ class HomebrewManager:
         sudo_cmd = f"sudo {command}"
         return self._run_command(sudo_cmd, check=check)
     
+    def _load_installed_formulae(self) -> Dict[str, str]:
+        """Get installed formulae as {name: versions}
+        
+        Homebrew's Ruby startup costs about a second per call, so a single
+        `brew list --versions` answers every installed-check and is cached
+        until the next `brew install`.
+        """
+        if self._installed_formulae is None:
+            formulae = {}
+            try:
+                result = subprocess.run(
+                    [f"{self.homebrew_bin}/brew", "list", "--versions"],
+                    capture_output=True,
+                    text=True,
+                    check=False
+                )
+                if result.returncode == 0:
+                    for line in result.stdout.splitlines():
+                        name, _, versions = line.partition(' ')
+                        if name:
+                            formulae[name] = versions
+            except OSError:
+                pass  # brew not installed yet
+            self._installed_formulae = formulae
+        return self._installed_formulae
+    
     def is_homebrew_installed(self) -> bool:
         """Check if Homebrew is installed"""
-        result = self._run_command("which brew", check=False)
-        return result.returncode == 0
+        return shutil.which("brew") is not None
     
     def install_homebrew(self) -> bool:
         """Install Homebrew if not already installed"""
@@ -83,38 +136,42 @@ class HomebrewManager:
             print(f"✗ Homebrew installation failed: {result.stderr}")
             return False
         
-        # Add Homebrew to PATH
-        homebrew_path = self.homebrew_bin
-        shell_profile = Path.home() / ".bashrc"
-        
-        with open(shell_profile, 'a') as f:
-            f.write('\n# Homebrew\n')
-            f.write(f'eval "$({homebrew_path}/brew shellenv)"\n')
-            f.write('\n# Always use latest Homebrew GCC for compilation\n')
-            f.write(f'export CC={homebrew_path}/gcc\n')
-            f.write(f'export CXX={homebrew_path}/g++\n')
-            f.write(f'export FC={homebrew_path}/gfortran\n')
-            f.write(f'export OMPI_CC={homebrew_path}/gcc\n')
-            f.write(f'export OMPI_CXX={homebrew_path}/g++\n')
-            f.write(f'export OMPI_FC={homebrew_path}/gfortran\n')
+        # Add Homebrew to PATH (once, even across repeated installs)
+        update_bashrc(self._bashrc_lines(), BASHRC_MARKER)
         
         print("✓ Homebrew installed successfully")
         return True
     
+    def _bashrc_lines(self) -> List[str]:
+        """~/.bashrc block putting Homebrew and its GCC first"""
+        homebrew_path = self.homebrew_bin
+        return [
+            BASHRC_MARKER,
+            '# Homebrew',
+            f'eval "$({homebrew_path}/brew shellenv)"',
+            '',
+            '# Always use latest Homebrew GCC for compilation',
+            f'export CC={homebrew_path}/gcc',
+            f'export CXX={homebrew_path}/g++',
+            f'export FC={homebrew_path}/gfortran',
+            f'export OMPI_CC={homebrew_path}/gcc',
+            f'export OMPI_CXX={homebrew_path}/g++',
+            f'export OMPI_FC={homebrew_path}/gfortran',
+        ]
+    
     def install_gcc(self) -> bool:
         """Install GCC compiler via Homebrew"""
         print("\n=== Installing GCC Compiler ===")
         
         # Check if gcc is already installed
-        result = self._run_command(f"{self.homebrew_bin}/brew list gcc", check=False)
-        if result.returncode == 0:
-            version_result = self._run_command(f"{self.homebrew_bin}/brew list --versions gcc", check=False)
-            if version_result.returncode == 0:
-                print(f"✓ GCC already installed: {version_result.stdout.strip()}")
-                return True
+        installed = self._load_installed_formulae()
+        if "gcc" in installed:
+            print(f"✓ GCC already installed: gcc {installed['gcc']}")
+            return True
         
         print("Installing GCC via Homebrew...")
         result = self._run_command(f"{self.homebrew_bin}/brew install gcc", check=False)
+        self._installed_formulae = None  # Re-read on next check
         
         if result.returncode != 0:
             print(f"✗ GCC installation failed: {result.stderr}")
@@ -128,15 +185,14 @@ class HomebrewManager:
         print("\n=== Installing Binutils ===")
         
         # Check if binutils is already installed
-        result = self._run_command(f"{self.homebrew_bin}/brew list binutils", check=False)
-        if result.returncode == 0:
-            version_result = self._run_command(f"{self.homebrew_bin}/brew list --versions binutils", check=False)
-            if version_result.returncode == 0:
-                print(f"✓ Binutils already installed: {version_result.stdout.strip()}")
-                return True
+        installed = self._load_installed_formulae()
+        if "binutils" in installed:
+            print(f"✓ Binutils already installed: binutils {installed['binutils']}")
+            return True
         
         print("Installing binutils via Homebrew...")
         result = self._run_command(f"{self.homebrew_bin}/brew install binutils", check=False)
+        self._installed_formulae = None  # Re-read on next check
         
         if result.returncode != 0:
             print(f"✗ Binutils installation failed: {result.stderr}")
@@ -145,58 +201,117 @@ class HomebrewManager:
         print("✓ Binutils installed successfully")
         return True
     
-    def create_gcc_symlinks(self) -> bool:
-        """Create symlinks for GCC to point to latest version"""
-        print("\n=== Creating GCC Symlinks ===")
+    def install_formulae(self, names: List[str]) -> bool:
+        """Install several formulae with a single `brew install`
+        
+        Formulae that are already installed are skipped. Auto-update is
+        disabled so brew does not run an implicit `brew update` first.
+        
+        Args:
+            names: Formula names to install
+            
+        Returns:
+            True if all formulae are installed
+        """
+        print(f"\n=== Installing {', '.join(names)} ===")
         
-        # Find the highest installed gcc version (use sort -V for version sorting, tail -1 for highest)
-        # Only consider actual binaries, not symlinks (using find -type f or checking Cellar path)
-        result = self._run_command(
-            f"ls -l {self.homebrew_bin}/gcc-* 2>/dev/null | grep Cellar | grep -E 'gcc-[0-9]+$' | tail -1",
+        installed = self._load_installed_formulae()
+        for name in names:
+            if name in installed:
+                print(f"✓ {name} already installed: {name} {installed[name]}")
+        
+        missing = [name for name in names if name not in installed]
+        if not missing:
+            return True
+        
+        env = os.environ.copy()
+        env['HOMEBREW_NO_AUTO_UPDATE'] = '1'
+        
+        print(f"Installing {' '.join(missing)} via Homebrew...")
+        result = subprocess.run(
+            [f"{self.homebrew_bin}/brew", "install", *missing],
+            env=env,
+            capture_output=True,
+            text=True,
             check=False
         )
+        self._installed_formulae = None  # Re-read on next check
         
-        if result.returncode != 0 or not result.stdout.strip():
-            # Fallback: try sorting by version number
-            result = self._run_command(
-                f"ls {self.homebrew_bin}/gcc-* 2>/dev/null | grep -E 'gcc-[0-9]+$' | sort -V | tail -1",
-                check=False
-            )
+        if result.returncode != 0:
+            print(f"✗ Installation of {' '.join(missing)} failed: {result.stderr}")
+            return False
         
-        if result.returncode != 0 or not result.stdout.strip():
+        print(f"✓ {' '.join(missing)} installed successfully")
+        return True
+    
+    def _detect_gcc_version(self) -> Optional[str]:
+        """Find the highest GCC major version in the Homebrew bin directory
+        
+        Links into the Cellar (the real Homebrew installs) take precedence
+        over the compatibility links this class creates itself.
+        
+        Returns:
+            Version string such as '15', or None if no GCC is found
+        """
+        cellar_versions = []
+        all_versions = []
+        try:
+            with os.scandir(self.homebrew_bin) as entries:
+                for entry in entries:
+                    match = _GCC_VERSIONED_RE.fullmatch(entry.name)
+                    if not match:
+                        continue
+                    version = int(match.group(1))
+                    all_versions.append(version)
+                    if entry.is_symlink() and 'Cellar' in os.readlink(entry.path):
+                        cellar_versions.append(version)
+        except OSError:
+            return None
+        
+        versions = cellar_versions or all_versions
+        return str(max(versions)) if versions else None
+    
+    def _gcc_symlink_command(self, gcc_version: str) -> str:
+        """
+        Command (to run with sudo) pointing the compiler names at one GCC.
+        
+        Args:
+            gcc_version: GCC major version, or a shell expression such as
+                "$v" expanded by the outer shell
+            
+        Returns:
+            str: bash -c command creating every symlink
+        """
+        ops = []
+        for compiler in ['gcc', 'g++', 'gfortran']:
+            source = f"{self.homebrew_bin}/{compiler}-{gcc_version}"
+            ops.append(f"ln -sf {source} {self.homebrew_bin}/{compiler}")
+            
+            # Compatibility symlinks for older GCC versions that PGAS libraries might expect
+            # This ensures tools like UPC++ that look for g++-11 will use our latest gcc-15
+            # Point directly to the versioned binary to avoid circular references
+            for old_version in ['11', '12', '13', '14']:  # Common legacy versions
+                target = f"{self.homebrew_bin}/{compiler}-{old_version}"
+                ops.append(f"rm -f {target} && ln -sf {source} {target}")
+        
+        return f'bash -c "{"; ".join(ops)}"'
+    
+    def create_gcc_symlinks(self) -> bool:
+        """Create symlinks for GCC to point to latest version"""
+        print("\n=== Creating GCC Symlinks ===")
+        
+        gcc_version = self._detect_gcc_version()
+        if gcc_version is None:
             print("⚠️  Could not detect GCC version for symlink creation")
             return False
         
-        gcc_path = result.stdout.strip().split()[-1] if '->' in result.stdout else result.stdout.strip()
-        gcc_version = gcc_path.split('-')[-1]
         print(f"Found GCC version: {gcc_version}")
         
-        # Create symlinks
-        symlinks = [
-            (f"gcc-{gcc_version}", "gcc"),
-            (f"g++-{gcc_version}", "g++"),
-            (f"gfortran-{gcc_version}", "gfortran"),
-        ]
-        
-        for source, target in symlinks:
-            cmd = f"ln -sf {self.homebrew_bin}/{source} {self.homebrew_bin}/{target}"
-            result = self._run_command(cmd, check=False)
-            if result.returncode != 0:
-                print(f"⚠️  Failed to create symlink {target} -> {source}")
-        
-        # Create compatibility symlinks for older GCC versions that PGAS libraries might expect
-        # This ensures tools like UPC++ that look for g++-11 will use our latest gcc-15
-        # Point directly to the versioned binary to avoid circular references
-        compat_versions = ['11', '12', '13', '14']  # Common legacy versions
-        for old_version in compat_versions:
-            for compiler in ['gcc', 'g++', 'gfortran']:
-                # Remove any existing symlink first
-                remove_cmd = f"sudo rm -f {self.homebrew_bin}/{compiler}-{old_version}"
-                self._run_command(remove_cmd, check=False)
-                # Create new symlink pointing to the actual versioned binary
-                cmd = f"sudo ln -sf {self.homebrew_bin}/{compiler}-{gcc_version} {self.homebrew_bin}/{compiler}-{old_version}"
-                result = self._run_command(cmd, check=False)
-                # Silently continue if symlink creation fails (non-critical)
+        # Run every link operation in a single sudo shell instead of one
+        # subprocess (and sudo re-auth) per link
+        result = self._run_sudo_command(self._gcc_symlink_command(gcc_version), check=False)
+        if result.returncode != 0:
+            print(f"⚠️  Some symlinks could not be created: {result.stderr.strip()}")
         
         print(f"✓ Created compiler symlinks:")
         print(f"  gcc/g++/gfortran -> gcc-{gcc_version} (latest from Homebrew)")
@@ -216,11 +331,10 @@ class HomebrewManager:
             print("✗ GCC not found or not working")
             return False
         
-        # Check symlink
-        result = self._run_command(f"ls -la {self.homebrew_bin}/gcc", check=False)
-        if result.returncode == 0:
-            symlink_info = result.stdout.strip().split()[-3:]
-            print(f"✓ Symlink: {' '.join(symlink_info)}")
+        # Check symlink (in-process, no `ls` needed)
+        gcc_link = f"{self.homebrew_bin}/gcc"
+        if os.path.islink(gcc_link):
+            print(f"✓ Symlink: {gcc_link} -> {os.readlink(gcc_link)}")
         
         return True
     
@@ -231,11 +345,18 @@ class HomebrewManager:
         binutils_path = f"{self.homebrew_opt}/binutils/bin"
         tools = ['as', 'ld', 'ar', 'ranlib']
         
+        # One shell for all probes; each prints exactly one line, which is
+        # empty when the tool is missing or fails
+        cmd = "; ".join(
+            f"{{ {binutils_path}/{tool} --version 2>/dev/null || echo; }} | head -1"
+            for tool in tools
+        )
+        result = self._run_command(cmd, check=False)
+        version_lines = result.stdout.split('\n')
+        
         all_ok = True
-        for tool in tools:
-            result = self._run_command(f"{binutils_path}/{tool} --version", check=False)
-            if result.returncode == 0:
-                version_line = result.stdout.split('\n')[0]
+        for tool, version_line in zip(tools, version_lines):
+            if version_line.strip():
                 print(f"✓ {tool}: {version_line}")
             else:
                 print(f"✗ {tool} not found")
@@ -243,6 +364,33 @@ class HomebrewManager:
         
         return all_ok
     
+    def _ssh_environment(self) -> str:
+        """Contents of ~/.ssh/environment pointing at Homebrew compilers"""
+        homebrew_sbin = "/home/linuxbrew/.linuxbrew/sbin"
+        binutils_bin = f"{self.homebrew_opt}/binutils/bin"
+        return (
+            f"PATH={binutils_bin}:{self.homebrew_bin}:{homebrew_sbin}:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin\n"
+            f"CC={self.homebrew_bin}/gcc\n"
+            f"CXX={self.homebrew_bin}/g++\n"
+            f"FC={self.homebrew_bin}/gfortran\n"
+            f"OMPI_CC={self.homebrew_bin}/gcc\n"
+            f"OMPI_CXX={self.homebrew_bin}/g++\n"
+            f"OMPI_FC={self.homebrew_bin}/gfortran\n"
+        )
+    
+    def _read_sshd_config(self, sshd_config: Path) -> str:
+        """Read sshd_config and its drop-ins, using sudo only if needed"""
+        files = [sshd_config] + sorted((sshd_config.parent / "sshd_config.d").glob("*.conf"))
+        try:
+            return "\n".join(path.read_text() for path in files)
+        except OSError:
+            # Not world-readable on this system
+            result = self._run_command(
+                "sudo cat " + " ".join(shlex.quote(str(path)) for path in files),
+                check=False
+            )
+            return result.stdout if result.returncode == 0 else ""
+    
     def configure_system_path(self) -> bool:
         """Configure system-wide PATH for Homebrew binaries"""
         print("\n=== Configuring System-Wide PATH ===")
@@ -256,17 +404,8 @@ class HomebrewManager:
         ssh_dir.mkdir(mode=0o700, exist_ok=True)
         
         ssh_env = ssh_dir / "environment"
-        homebrew_sbin = "/home/linuxbrew/.linuxbrew/sbin"
-        binutils_bin = f"{self.homebrew_opt}/binutils/bin"
-        
         with open(ssh_env, 'w') as f:
-            f.write(f"PATH={binutils_bin}:{self.homebrew_bin}:{homebrew_sbin}:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin\n")
-            f.write(f"CC={self.homebrew_bin}/gcc\n")
-            f.write(f"CXX={self.homebrew_bin}/g++\n")
-            f.write(f"FC={self.homebrew_bin}/gfortran\n")
-            f.write(f"OMPI_CC={self.homebrew_bin}/gcc\n")
-            f.write(f"OMPI_CXX={self.homebrew_bin}/g++\n")
-            f.write(f"OMPI_FC={self.homebrew_bin}/gfortran\n")
+            f.write(self._ssh_environment())
         
         ssh_env.chmod(0o600)
         print("✓ Created ~/.ssh/environment with Homebrew compiler settings")
@@ -274,37 +413,64 @@ class HomebrewManager:
         # Update sshd_config to permit environment variables
         sshd_config = Path("/etc/ssh/sshd_config")
         if sshd_config.exists():
-            # Use sudo to read sshd_config
-            result = self._run_command("sudo cat /etc/ssh/sshd_config", check=False)
-            config_content = result.stdout if result.returncode == 0 else ""
+            config_content = self._read_sshd_config(sshd_config)
             
-            if "PermitUserEnvironment" not in config_content:
+            if not _PERMIT_USER_ENV_RE.search(config_content):
                 print("Adding PermitUserEnvironment to sshd_config...")
-                self._run_sudo_command(
-                    "bash -c 'echo \"PermitUserEnvironment yes\" >> /etc/ssh/sshd_config'",
-                    check=False
-                )
+                dropin_dir = sshd_config.parent / "sshd_config.d"
+                if dropin_dir.is_dir() and re.search(r'^\s*Include\s+\S*sshd_config\.d', config_content, re.MULTILINE):
+                    # Drop-in file: idempotent and leaves the distro's sshd_config alone
+                    self._run_command(
+                        f"echo 'PermitUserEnvironment yes' | sudo tee {dropin_dir}/10-cluster.conf >/dev/null",
+                        check=False
+                    )
+                else:
+                    # sshd uses the first value it reads, so an active "no"
+                    # is commented out and "yes" goes first in the file,
+                    # ahead of any Match block
+                    self._run_sudo_command(
+                        f"sed -i -E -e {shlex.quote(_SSHD_DISABLE_PERMIT_USER_ENV)} "
+                        f"-e '1i PermitUserEnvironment yes' {sshd_config}",
+                        check=False
+                    )
                 self._run_sudo_command("systemctl restart sshd", check=False)
                 print("✓ Updated sshd_config")
         
         return True
     
+    def is_configured(self) -> bool:
+        """Check whether a previous local setup completed
+        
+        Looks only at local files (the ~/.bashrc marker and the gcc symlink),
+        so repeat runs cost no subprocesses.
+        """
+        if not os.path.exists(f"{self.homebrew_bin}/gcc"):
+            return False
+        try:
+            return SETUP_MARKER in (Path.home() / ".bashrc").read_text()
+        except OSError:
+            return False
+    
+    def _mark_configured(self):
+        """Record a successful local setup in ~/.bashrc"""
+        update_bashrc([SETUP_MARKER], SETUP_MARKER)
+    
     def install_and_configure_local(self) -> bool:
         """Complete Homebrew, GCC, and binutils setup on local node"""
         print("\n" + "="*70)
         print("HOMEBREW AND COMPILER SETUP")
         print("="*70)
         
+        if self.is_configured():
+            print("✓ Homebrew and compilers already configured")
+            return True
+        
         # Install Homebrew
         if not self.install_homebrew():
             return False
         
-        # Install GCC
-        if not self.install_gcc():
-            return False
-        
-        # Install binutils
-        if not self.install_binutils():
+        # Install GCC and binutils in one brew run
+        if not self.install_formulae(["gcc", "binutils"]):
             return False
         
         # Create GCC symlinks
@@ -315,9 +481,124 @@ class HomebrewManager:
         if not self.configure_system_path():
             print("⚠️  Warning: Failed to configure system PATH, but continuing...")
         
-        # Verify installations
-        self.verify_gcc_installation()
-        self.verify_binutils_installation()
+        # Verify installations; only a fully working setup is marked done
+        gcc_ok = self.verify_gcc_installation()
+        binutils_ok = self.verify_binutils_installation()
+        if gcc_ok and binutils_ok:
+            self._mark_configured()
         
         print("\n✓ Homebrew and compiler setup completed successfully")
         return True
+    
+    def _permit_user_env_script(self) -> str:
+        """Root shell script making sshd honour ~/.ssh/environment
+        
+        The same steps configure_system_path takes locally: nothing changes
+        if an active PermitUserEnvironment yes exists; otherwise a drop-in
+        file is written when sshd_config includes sshd_config.d, else an
+        active "no" is commented out and "yes" is put first in sshd_config.
+        """
+        sshd_config = "/etc/ssh/sshd_config"
+        dropin_dir = "/etc/ssh/sshd_config.d"
+        return (
+            f"if [ -e {sshd_config} ] && ! grep -qiE "
+            f"'^[[:space:]]*PermitUserEnvironment[[:space:]]+yes' {sshd_config} {dropin_dir}/*.conf 2>/dev/null; then "
+            f"if [ -d {dropin_dir} ] && grep -qE "
+            f"'^[[:space:]]*Include[[:space:]]+[^[:space:]]*sshd_config\\.d' {sshd_config}; then "
+            f"echo 'PermitUserEnvironment yes' > {dropin_dir}/10-cluster.conf; "
+            f"else sed -i -E -e {shlex.quote(_SSHD_DISABLE_PERMIT_USER_ENV)} "
+            f"-e '1i PermitUserEnvironment yes' {sshd_config}; fi; "
+            "systemctl restart sshd; fi"
+        )
+    
+    def _remote_setup_script(self) -> str:
+        """Shell script that performs install_and_configure_local on one node
+        
+        Mirrors the local steps: Homebrew (with its ~/.bashrc block), gcc
+        and binutils in one brew run, the compiler and compatibility
+        symlinks, ~/.ssh/environment and the sshd PermitUserEnvironment
+        setting, then the setup marker once gcc and as both run. A node
+        that is already configured is left alone, so a worker costs one
+        SSH round trip.
+        
+        With a password, sudo is validated once from stdin (see
+        _setup_remote_node) and its cached credentials serve later steps.
+        """
+        brew = f"{self.homebrew_bin}/brew"
+        bashrc_block = "\n" + "".join(line + "\n" for line in self._bashrc_lines())
+        steps = [
+            "export NONINTERACTIVE=1 HOMEBREW_NO_AUTO_UPDATE=1",
+            f'{{ test -x {brew} || /bin/bash -c "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)"; }}',
+            f"{{ grep -qF {shlex.quote(BASHRC_MARKER)} ~/.bashrc 2>/dev/null || printf %s {shlex.quote(bashrc_block)} >> ~/.bashrc; }}",
+            f"{{ {brew} list --versions gcc binutils >/dev/null || {brew} install gcc binutils; }}",
+            f"v=$(ls {self.homebrew_bin} | grep -E '^gcc-[0-9]+$' | sort -V | tail -1 | cut -d- -f2)",
+            'test -n "$v"',
+            f"sudo {self._gcc_symlink_command('$v')}",
+            "mkdir -p -m 700 ~/.ssh",
+            f"printf %s {shlex.quote(self._ssh_environment())} > ~/.ssh/environment",
+            "chmod 600 ~/.ssh/environment",
+            f"{{ sudo bash -c {shlex.quote(self._permit_user_env_script())} || echo '⚠ Could not update sshd_config' >&2; }}",
+            f"{self.homebrew_bin}/gcc --version >/dev/null",
+            f"{self.homebrew_opt}/binutils/bin/as --version >/dev/null",
+            f"printf '\\n%s\\n' {shlex.quote(SETUP_MARKER)} >> ~/.bashrc",
+        ]
+        if self.password:
+            steps.insert(0, "sudo -S -p '' -v")
+        
+        # Same check as is_configured
+        configured = (
+            f"test -e {self.homebrew_bin}/gcc && grep -qF {shlex.quote(SETUP_MARKER)} ~/.bashrc 2>/dev/null"
+        )
+        return f"{configured} || {{ {' && '.join(steps)}; }}"
+    
+    def _setup_remote_node(self, node_ip: str) -> subprocess.CompletedProcess:
+        """Run the Homebrew setup script on one worker over SSH
+        
+        Returns:
+            subprocess.CompletedProcess: Result, returncode -1 on error/timeout
+        """
+        ssh_cmd = [
+            *ssh_password_prefix(self.username, self.password, node_ip),
+            "ssh", "-o", "StrictHostKeyChecking=no", *SSH_MUX_OPTS,
+            f"{self.username}@{node_ip}", self._remote_setup_script()
+        ]
+        try:
+            # The password on stdin is read by the script's sudo -S -v
+            return subprocess.run(ssh_cmd, capture_output=True, text=True, check=False,
+                                  input=f"{self.password}\n" if self.password else None,
+                                  timeout=REMOTE_SETUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return subprocess.CompletedProcess(
+                ssh_cmd, -1, stdout="", stderr=f"timed out after {REMOTE_SETUP_TIMEOUT} seconds"
+            )
+        except FileNotFoundError as e:
+            return subprocess.CompletedProcess(ssh_cmd, -1, stdout="", stderr=str(e))
+    
+    def install_and_configure_cluster(self) -> bool:
+        """Homebrew, GCC, and binutils setup on the local node and all workers
+        
+        Workers are configured concurrently, one SSH invocation each, while
+        the local node is set up, so the total time is roughly that of the
+        slowest node rather than the sum.
+        """
+        if not self.worker_ips:
+            return self.install_and_configure_local()
+        
+        print(f"\n=== Configuring Homebrew on {len(self.worker_ips)} worker(s) in the background ===")
+        
+        with ThreadPoolExecutor(max_workers=min(len(self.worker_ips), MAX_SSH_FANOUT)) as executor:
+            # map() submits every worker immediately; results are collected
+            # after the local setup finishes
+            remote_results = executor.map(self._setup_remote_node, self.worker_ips)
+            all_ok = self.install_and_configure_local()
+            results = dict(zip(self.worker_ips, remote_results))
+        
+        print("\n=== Worker Homebrew Setup ===")
+        for node_ip, result in results.items():
+            if result.returncode == 0:
+                print(f"✓ {node_ip}: Homebrew and compilers configured")
+            else:
+                print(f"✗ {node_ip}: setup failed: {result.stderr.strip()}")
+                all_ok = False
+        
+        return all_ok
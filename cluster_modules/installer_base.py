@@ -4,6 +4,9 @@ Base installer class for software components
 Provides common installation patterns and utilities.
 """
 
+import os
+import shutil
+import tempfile
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Optional
@@ -11,6 +14,50 @@ from typing import Optional
 from .core import ClusterCore
 
 
+def update_bashrc(lines: list, marker: str, bashrc: Optional[Path] = None) -> bool:
+    """Add a block of lines to ~/.bashrc exactly once
+    
+    The file is rewritten through a temporary file and os.replace, so an
+    interrupted run can never leave a half-written .bashrc behind.
+    
+    Args:
+        lines: List of lines to add
+        marker: Unique marker to identify the section (written as the
+            first line of the block unless one of the lines contains it)
+        bashrc: File to update (default: ~/.bashrc)
+        
+    Returns:
+        True if the block was added, False if it was already present
+    """
+    bashrc = (bashrc or Path.home() / ".bashrc").resolve()
+    
+    try:
+        with open(bashrc, 'rb') as f:
+            data = f.read()
+            mode = os.fstat(f.fileno()).st_mode & 0o7777
+    except FileNotFoundError:
+        data, mode = b'', 0o644
+    
+    if marker.encode() in data:
+        return False
+    
+    if not any(marker in line for line in lines):
+        lines = [marker] + list(lines)
+    block = '\n' + ''.join(line + '\n' for line in lines)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=bashrc.parent, prefix='.bashrc.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.write(block.encode())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, bashrc)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
 class InstallerBase(ABC):
     """Abstract base class for software installers"""
     
@@ -51,8 +98,7 @@ class InstallerBase(ABC):
         Returns:
             True if command exists
         """
-        result = self.core.run_command(f"which {command}", check=False)
-        return result.returncode == 0
+        return shutil.which(command) is not None
     
     def ensure_directory(self, path: Path, mode: int = 0o755):
         """Ensure directory exists with proper permissions
@@ -70,17 +116,4 @@ class InstallerBase(ABC):
             lines: List of lines to add
             marker: Unique marker to identify the section
         """
-        bashrc = Path.home() / ".bashrc"
-        
-        # Check if already added
-        if bashrc.exists():
-            with open(bashrc, 'r') as f:
-                content = f.read()
-                if marker in content:
-                    return
-        
-        # Append lines
-        with open(bashrc, 'a') as f:
-            f.write('\n')
-            for line in lines:
-                f.write(line + '\n')
+        update_bashrc(lines, marker)
@@ -9,13 +9,39 @@ Author: Olumuyiwa Oluwasanmi
 Date: November 4, 2025
 """
 
+import os
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shares the cluster-wide SSH master connections, so every pdsh fan-out
+# after the first skips the TCP handshake and authentication
+try:
+    from .core import pdsh_env
+except ImportError:
+    # Run as a script: cluster_modules/ itself is on sys.path
+    from core import pdsh_env
+
+# Benchmark and launcher processes removed by cleanup_processes (pgrep -f regex)
+BENCHMARK_PROCS = "[m]pi_latency|[o]penshmem_latency|[h]ybrid_mpi|[o]penmp_parallel|[u]pcxx_latency|[m]pirun|[o]shrun|[u]pcxx-run"
+
+
+def _dumps(obj) -> bytes:
+    """Serialize one JSON Lines record, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
 
 @dataclass
 class NodeInfo:
@@ -41,17 +67,47 @@ class MultiNodeBenchmarkRunner:
         self.benchmark_dir = Path.home() / "cluster_build_sources" / "benchmarks"
         self.results_dir = self.benchmark_dir / "results"
         self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.run_id = int(time.time())  # Tags every log/result file of this run
+        
+        # The node set is fixed for the life of the runner
+        self._node_list = ",".join(node.ip for node in self.nodes)
+        self._hostfile_content = "\n".join(f"{node.ip} slots={node.cpus}" for node in self.nodes)
+        self._hostfile: Optional[Path] = None
+        
+        # Environment for pdsh: ssh transport with connection multiplexing
+        self.pdsh_env = pdsh_env()
+        self.pdsh_env.setdefault('PDSH_RCMD_TYPE', 'ssh')
+    
+    def warm_connections(self):
+        """Open the SSH master connection to every node once up front"""
+        (Path.home() / ".ssh").mkdir(mode=0o700, exist_ok=True)
+        try:
+            subprocess.run(
+                ["pdsh", "-w", self.get_node_list(), "true"],
+                env=self.pdsh_env,
+                capture_output=True,
+                timeout=30
+            )
+        except Exception as e:
+            print(f"Warning: Could not pre-open SSH connections: {e}")
     
     def cleanup_processes(self):
         """Kill any hanging benchmark processes on all nodes"""
         print("Cleaning up any running benchmark processes...")
         node_list = self.get_node_list()
-        cmd = f"pdsh -w {node_list} \"pkill -9 -f 'mpi_latency|openshmem_latency|hybrid_mpi|openmp_parallel|upcxx_latency|mpirun|oshrun|upcxx-run' 2>/dev/null; echo 'Cleaned: \\$(hostname)'\""
+        # argv list: the remote command reaches the node's shell untouched.
+        # One pgrep scan collects every PID and xargs kills them in a single
+        # kill call; the [x] brackets keep the pattern from matching the
+        # remote shell that runs this very command line.
+        cmd = [
+            "pdsh", "-w", node_list,
+            f"pgrep -f '{BENCHMARK_PROCS}' | xargs -r kill -9; echo \"Cleaned: $(hostname)\""
+        ]
         
         try:
             result = subprocess.run(
                 cmd,
-                shell=True,
+                env=self.pdsh_env,
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -59,27 +115,93 @@ class MultiNodeBenchmarkRunner:
             print(result.stdout)
         except Exception as e:
             print(f"Warning: Cleanup had issues: {e}")
-        
-        time.sleep(1)  # Give processes time to die
-        
+    
     def get_node_list(self) -> str:
         """Get comma-separated list of node IPs"""
-        return ",".join(node.ip for node in self.nodes)
+        return self._node_list
     
     def get_hostfile_content(self) -> str:
         """Generate hostfile content for MPI"""
-        lines = []
-        for node in self.nodes:
-            lines.append(f"{node.ip} slots={node.cpus}")
-        return "\n".join(lines)
+        return self._hostfile_content
     
     def create_hostfile(self) -> Path:
-        """Create MPI hostfile"""
+        """Create MPI hostfile
+        
+        Written at most once per runner, and not at all when the file on
+        disk already has the right contents.
+        """
+        if self._hostfile is not None:
+            return self._hostfile
+        
         hostfile = self.benchmark_dir / "hostfile"
-        hostfile.write_text(self.get_hostfile_content())
-        print(f"✓ Created hostfile: {hostfile}")
+        content = self._hostfile_content
+        try:
+            # Size check first so a mismatched file is never read
+            unchanged = (hostfile.stat().st_size == len(content.encode())
+                         and hostfile.read_text() == content)
+        except OSError:
+            unchanged = False
+        
+        if unchanged:
+            print(f"✓ Using existing hostfile: {hostfile}")
+        else:
+            hostfile.write_text(content)
+            print(f"✓ Created hostfile: {hostfile}")
+        
+        self._hostfile = hostfile
         return hostfile
     
+    def _run_logged(self, name: str, cmd: List[str],
+                    env: Optional[Dict[str, str]] = None,
+                    timeout: int = 300) -> Dict[str, any]:
+        """Run a benchmark launcher, teeing its output to the console and a log file
+        
+        stdout and stderr are merged and copied line by line to the console
+        and to results/<name>_<run id>.log as they arrive, so progress stays
+        visible while memory use does not grow with the output.
+        
+        The result dict no longer carries the output itself: the "stdout"
+        and "stderr" keys returned by earlier versions are replaced by
+        "log", the path of the file holding the complete output.
+        
+        Raises:
+            subprocess.TimeoutExpired: if the launcher runs past timeout
+        """
+        log_file = self.results_dir / f"{name}_{self.run_id}.log"
+        print(f"Output: {log_file}")
+        
+        timed_out = threading.Event()
+        with open(log_file, 'w') as log, subprocess.Popen(
+            cmd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        ) as proc:
+            def kill():
+                timed_out.set()
+                proc.kill()
+            
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    print(line, end='')
+                    log.write(line)
+                proc.wait()
+            finally:
+                timer.cancel()
+        
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        
+        return {
+            "success": proc.returncode == 0,
+            "returncode": proc.returncode,
+            "log": str(log_file)
+        }
+    
     def run_openmp_all_nodes(self) -> Dict[str, any]:
         """Run OpenMP benchmark on all nodes simultaneously using pdsh"""
         print("\n" + "="*60)
@@ -94,28 +216,12 @@ class MultiNodeBenchmarkRunner:
             return {"success": False, "error": "Benchmark not compiled"}
         
         node_list = self.get_node_list()
-        cmd = f"pdsh -w {node_list} 'cd {self.benchmark_dir} && bin/openmp_parallel'"
+        cmd = ["pdsh", "-w", node_list, f"cd {self.benchmark_dir} && bin/openmp_parallel"]
         
-        print(f"\nCommand: {cmd}")
+        print(f"\nCommand: {' '.join(cmd)}")
         print("-" * 60)
         
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", result.stderr)
-        
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr
-        }
+        return self._run_logged("openmp", cmd, env=self.pdsh_env)
     
     def run_mpi_all_nodes(self, num_processes: int = 4) -> Dict[str, any]:
         """Run MPI benchmark across all nodes"""
@@ -146,22 +252,7 @@ class MultiNodeBenchmarkRunner:
         print(f"\nCommand: {' '.join(cmd)}")
         print("-" * 60)
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", result.stderr)
-        
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr
-        }
+        return self._run_logged("mpi", cmd)
     
     def run_hybrid_all_nodes(self, mpi_processes: int = 4, threads_per_process: int = None) -> Dict[str, any]:
         """Run hybrid MPI+OpenMP benchmark across all nodes"""
@@ -203,22 +294,7 @@ class MultiNodeBenchmarkRunner:
         print(f"\nCommand: {' '.join(cmd)}")
         print("-" * 60)
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", result.stderr)
-        
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr
-        }
+        return self._run_logged("hybrid", cmd)
     
     def run_openshmem_all_nodes(self, num_pes: int = 4) -> Dict[str, any]:
         """Run OpenSHMEM benchmark across all nodes"""
@@ -251,22 +327,7 @@ class MultiNodeBenchmarkRunner:
         print(f"\nCommand: {' '.join(cmd)}")
         print("-" * 60)
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", result.stderr)
-        
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr
-        }
+        return self._run_logged("openshmem", cmd)
     
     def run_upcxx_all_nodes(self, num_processes: int = 4) -> Dict[str, any]:
         """Run UPC++ benchmark across all nodes"""
@@ -282,7 +343,6 @@ class MultiNodeBenchmarkRunner:
             return {"success": False, "error": "Benchmark not compiled"}
         
         # UPC++ uses GASNet with SSH spawning
-        import os
         env = os.environ.copy()
         env['GASNET_SSH_SERVERS'] = self.get_node_list()
         env['GASNET_SPAWNFN'] = 'ssh'
@@ -297,23 +357,7 @@ class MultiNodeBenchmarkRunner:
         print(f"GASNET_SSH_SERVERS={env['GASNET_SSH_SERVERS']}")
         print("-" * 60)
         
-        result = subprocess.run(
-            cmd,
-            env=env,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", result.stderr)
-        
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr
-        }
+        return self._run_logged("upcxx", cmd, env=env)
     
     def run_all_benchmarks(self):
         """Run comprehensive benchmark suite across all nodes"""
@@ -324,37 +368,49 @@ class MultiNodeBenchmarkRunner:
         print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
         print("="*70)
         
-        # Clean up any hanging processes first
-        self.cleanup_processes()
-        
-        results = {}
-        
-        # 1. OpenMP on all nodes simultaneously
-        results['openmp'] = self.run_openmp_all_nodes()
-        time.sleep(2)
-        self.cleanup_processes()
-        
-        # 2. MPI across 4 nodes
-        results['mpi'] = self.run_mpi_all_nodes(num_processes=4)
-        time.sleep(2)
-        self.cleanup_processes()
-        
-        # 3. Hybrid MPI+OpenMP (4 processes × max threads each)
-        results['hybrid'] = self.run_hybrid_all_nodes(mpi_processes=4)
-        time.sleep(2)
-        self.cleanup_processes()
+        # Launcher prep (hostfile) is local file work, so it runs while the
+        # network-bound connection warm-up and cleanup are in flight
+        with ThreadPoolExecutor(max_workers=1) as prep:
+            hostfile_ready = prep.submit(self.create_hostfile)
+            
+            self.warm_connections()
+            
+            # Clean up any hanging processes first. Each benchmark below runs to
+            # completion (or its timeout) before the next starts, so a single
+            # cleanup before and after the suite is enough.
+            self.cleanup_processes()
+            
+            hostfile_ready.result()
+        
+        steps = [
+            # 1. OpenMP on all nodes simultaneously
+            ('openmp', self.run_openmp_all_nodes, {}),
+            # 2. MPI across 4 nodes
+            ('mpi', self.run_mpi_all_nodes, {'num_processes': 4}),
+            # 3. Hybrid MPI+OpenMP (4 processes × max threads each)
+            ('hybrid', self.run_hybrid_all_nodes, {'mpi_processes': 4}),
+            # 4. OpenSHMEM across 4 PEs
+            ('openshmem', self.run_openshmem_all_nodes, {'num_pes': 4}),
+            # 5. UPC++ across 4 processes
+            ('upcxx', self.run_upcxx_all_nodes, {'num_processes': 4}),
+        ]
         
-        # 4. OpenSHMEM across 4 PEs
-        results['openshmem'] = self.run_openshmem_all_nodes(num_pes=4)
-        time.sleep(2)
-        self.cleanup_processes()
+        # Each result is appended to a JSON Lines file as soon as it is
+        # available, so a crash part-way through keeps the finished runs
+        records_file = self.results_dir / f"multi_node_results_{self.run_id}.jsonl"
         
-        # 5. UPC++ across 4 processes
-        results['upcxx'] = self.run_upcxx_all_nodes(num_processes=4)
-        self.cleanup_processes()
+        results = {}
+        try:
+            with open(records_file, 'wb') as records:
+                for name, run, kwargs in steps:
+                    results[name] = run(**kwargs)
+                    records.write(_dumps({"name": name, **results[name]}) + b"\n")
+                    records.flush()
+        finally:
+            self.cleanup_processes()
         
         # Save results
-        results_file = self.results_dir / f"multi_node_results_{int(time.time())}.json"
+        results_file = self.results_dir / f"multi_node_results_{self.run_id}.json"
         with open(results_file, 'w') as f:
             json.dump(results, f, indent=2)
         
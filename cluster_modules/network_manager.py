@@ -12,12 +12,31 @@ Author: Olumuyiwa Oluwasanmi
 Date: November 4, 2025
 """
 
+import asyncio
+import functools
+import re
+import shlex
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
+from .core import MAX_SSH_FANOUT, RemoteNodeMixin, pdsh_env
 
-class NetworkManager:
+# pdsh's own per-host diagnostics on stderr, e.g.
+# "pdsh@master: 192.168.1.139: ssh exited with exit code 1"
+_PDSH_STATUS_RE = re.compile(r'^pdsh@[^:]+: ([^:\s]+): (.*)$')
+_PDSH_EXIT_CODE_RE = re.compile(r'exit code (\d+)')
+
+
+@functools.lru_cache(maxsize=8)
+def _per_node_commands(template: str, ips: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Format a per-node firewall command for each IP, once per node list"""
+    return tuple(template.format(ip=ip) for ip in ips)
+
+
+class NetworkManager(RemoteNodeMixin):
     """
     Manages network and firewall configuration across the cluster.
     
@@ -30,6 +49,50 @@ class NetworkManager:
         node_hostnames (Dict[str, str]): Mapping of IPs to hostnames
     """
     
+    # Port ranges for different services
+    MPI_PORTS = (50000, 50200)
+    SLURM_PORTS = (6817, 6818, 6819)  # slurmctld, slurmd, slurmdbd
+    SSH_PORT = 22
+    
+    # Firewall commands (without sudo) that do not depend on the node list;
+    # the per-node rules go between the head and the tail
+    UFW_HEAD_CMDS = (
+        # Allow SSH
+        f"ufw allow {SSH_PORT}",
+        
+        # Allow MPI port range
+        f"ufw allow {MPI_PORTS[0]}:{MPI_PORTS[1]}/tcp",
+        f"ufw allow {MPI_PORTS[0]}:{MPI_PORTS[1]}/udp",
+        
+        # Allow Slurm ports
+        *[f"ufw allow {port}" for port in SLURM_PORTS],
+    )
+    UFW_NODE_CMD = "ufw allow from {ip}"
+    UFW_TAIL_CMDS = (
+        # Enable UFW
+        "ufw --force enable",
+    )
+    
+    FIREWALLD_HEAD_CMDS = (
+        # Start firewalld
+        "systemctl start firewalld",
+        
+        # Allow SSH
+        "firewall-cmd --permanent --add-service=ssh",
+        
+        # Allow MPI port range
+        f"firewall-cmd --permanent --add-port={MPI_PORTS[0]}-{MPI_PORTS[1]}/tcp",
+        f"firewall-cmd --permanent --add-port={MPI_PORTS[0]}-{MPI_PORTS[1]}/udp",
+        
+        # Allow Slurm ports
+        *[f"firewall-cmd --permanent --add-port={port}/tcp" for port in SLURM_PORTS],
+    )
+    FIREWALLD_NODE_CMD = "firewall-cmd --permanent --zone=trusted --add-source={ip}"
+    FIREWALLD_TAIL_CMDS = (
+        # Reload firewall
+        "firewall-cmd --reload",
+    )
+    
     def __init__(self, username: str, password: str, master_ip: str, worker_ips: List[str],
                  node_hostnames: Optional[Dict[str, str]] = None):
         """
@@ -50,9 +113,9 @@ class NetworkManager:
         self.node_hostnames = node_hostnames or self._generate_default_hostnames()
         
         # Port ranges for different services
-        self.mpi_ports = (50000, 50200)
-        self.slurm_ports = [6817, 6818, 6819]  # slurmctld, slurmd, slurmdbd
-        self.ssh_port = 22
+        self.mpi_ports = self.MPI_PORTS
+        self.slurm_ports = list(self.SLURM_PORTS)
+        self.ssh_port = self.SSH_PORT
     
     def _generate_default_hostnames(self) -> Dict[str, str]:
         """
@@ -69,35 +132,43 @@ class NetworkManager:
         
         return hostnames
     
-    def detect_firewall_type(self) -> str:
-        """
-        Detect which firewall system is in use.
-        
-        Returns:
-            str: 'ufw', 'firewalld', or 'none'
-        """
+    @functools.cached_property
+    def _firewall_type(self) -> str:
+        """Firewall found on PATH, looked up once per manager"""
         # Check for UFW (Ubuntu/Debian)
-        ufw_check = subprocess.run(["which", "ufw"], capture_output=True)
-        if ufw_check.returncode == 0:
+        if shutil.which("ufw"):
             return "ufw"
         
         # Check for firewalld (Red Hat/CentOS)
-        firewalld_check = subprocess.run(["which", "firewall-cmd"], capture_output=True)
-        if firewalld_check.returncode == 0:
+        if shutil.which("firewall-cmd"):
             return "firewalld"
         
         return "none"
     
-    def configure_firewall_local(self) -> bool:
+    def detect_firewall_type(self) -> str:
+        """
+        Detect which firewall system is in use.
+        
+        Returns:
+            str: 'ufw', 'firewalld', or 'none'
+        """
+        return self._firewall_type
+    
+    def configure_firewall_local(self, firewall_type: Optional[str] = None) -> bool:
         """
         Configure firewall on local node to allow cluster traffic.
         
+        Args:
+            firewall_type: Firewall already detected by the caller
+                (default: detect it)
+            
         Returns:
             bool: True if configuration successful, False otherwise
         """
         print("\n=== Configuring Firewall locally ===")
         
-        firewall_type = self.detect_firewall_type()
+        if firewall_type is None:
+            firewall_type = self.detect_firewall_type()
         print(f"Detected firewall: {firewall_type}")
         
         if firewall_type == "ufw":
@@ -108,53 +179,80 @@ class NetworkManager:
             print("⚠ No firewall detected or firewall not supported")
             return True
     
-    def _configure_ufw_local(self) -> bool:
+    def _ufw_commands(self) -> Tuple[str, ...]:
         """
-        Configure UFW firewall on local node.
+        UFW commands (without sudo) that open the cluster ports.
         
         Returns:
-            bool: True if configuration successful, False otherwise
+            Tuple[str, ...]: Commands in execution order
         """
-        print("Configuring UFW...")
+        return (
+            self.UFW_HEAD_CMDS
+            + _per_node_commands(self.UFW_NODE_CMD, tuple(self.all_ips))
+            + self.UFW_TAIL_CMDS
+        )
+    
+    def _firewalld_commands(self) -> Tuple[str, ...]:
+        """
+        firewalld commands (without sudo) that open the cluster ports.
         
-        commands = [
-            # Allow SSH
-            ["sudo", "ufw", "allow", str(self.ssh_port)],
-            
-            # Allow MPI port range
-            ["sudo", "ufw", "allow", f"{self.mpi_ports[0]}:{self.mpi_ports[1]}/tcp"],
-            ["sudo", "ufw", "allow", f"{self.mpi_ports[0]}:{self.mpi_ports[1]}/udp"],
-            
-            # Allow Slurm ports
-            *[["sudo", "ufw", "allow", str(port)] for port in self.slurm_ports],
-            
-            # Allow traffic from cluster nodes
-            *[["sudo", "ufw", "allow", "from", ip] for ip in self.all_ips],
+        Returns:
+            Tuple[str, ...]: Commands in execution order
+        """
+        return (
+            self.FIREWALLD_HEAD_CMDS
+            + _per_node_commands(self.FIREWALLD_NODE_CMD, tuple(self.all_ips))
+            + self.FIREWALLD_TAIL_CMDS
+        )
+    
+    def _configure_firewall_batch(self, name: str, commands: Tuple[str, ...], status_cmd: str) -> bool:
+        """
+        Run firewall commands and a final status query in one sudo shell.
+        
+        A failing command only produces a warning, as before, and the
+        status query's exit code decides success.
+        
+        Args:
+            name: Firewall name for messages
+            commands: Commands to run (without sudo)
+            status_cmd: Command printing the resulting firewall state
             
-            # Enable UFW
-            ["sudo", "ufw", "--force", "enable"],
-        ]
+        Returns:
+            bool: True if configuration successful, False otherwise
+        """
+        script = "\n".join(
+            f"{cmd} > /dev/null || echo {shlex.quote(f'⚠ Warning: sudo {cmd} failed')} >&2"
+            for cmd in commands
+        ) + f"\n{status_cmd}"
         
-        for cmd in commands:
-            try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                if result.returncode != 0:
-                    print(f"⚠ Warning: {' '.join(cmd)} failed: {result.stderr}")
-            except Exception as e:
-                print(f"⚠ Warning configuring UFW: {e}")
+        try:
+            result = subprocess.run(["sudo", "bash", "-c", script],
+                                    capture_output=True, text=True, timeout=120)
+        except Exception as e:
+            print(f"⚠ Warning configuring {name}: {e}")
+            return False
         
-        # Check UFW status
-        status_cmd = ["sudo", "ufw", "status", "verbose"]
-        result = subprocess.run(status_cmd, capture_output=True, text=True)
+        if result.stderr:
+            print(result.stderr.rstrip())
         
         if result.returncode == 0:
-            print("✓ UFW configured successfully")
+            print(f"✓ {name} configured successfully")
             print(result.stdout)
             return True
         else:
-            print("✗ Failed to get UFW status")
+            print(f"✗ Failed to get {name} status")
             return False
     
+    def _configure_ufw_local(self) -> bool:
+        """
+        Configure UFW firewall on local node.
+        
+        Returns:
+            bool: True if configuration successful, False otherwise
+        """
+        print("Configuring UFW...")
+        return self._configure_firewall_batch("UFW", self._ufw_commands(), "ufw status verbose")
+    
     def _configure_firewalld_local(self) -> bool:
         """
         Configure firewalld on local node.
@@ -163,63 +261,30 @@ class NetworkManager:
             bool: True if configuration successful, False otherwise
         """
         print("Configuring firewalld...")
-        
-        commands = [
-            # Start firewalld
-            ["sudo", "systemctl", "start", "firewalld"],
-            
-            # Allow SSH
-            ["sudo", "firewall-cmd", "--permanent", "--add-service=ssh"],
-            
-            # Allow MPI port range
-            ["sudo", "firewall-cmd", "--permanent", 
-             f"--add-port={self.mpi_ports[0]}-{self.mpi_ports[1]}/tcp"],
-            ["sudo", "firewall-cmd", "--permanent",
-             f"--add-port={self.mpi_ports[0]}-{self.mpi_ports[1]}/udp"],
-            
-            # Allow Slurm ports
-            *[["sudo", "firewall-cmd", "--permanent", f"--add-port={port}/tcp"] 
-              for port in self.slurm_ports],
-            
-            # Add cluster nodes to trusted zone
-            *[["sudo", "firewall-cmd", "--permanent", 
-               "--zone=trusted", f"--add-source={ip}"] for ip in self.all_ips],
-            
-            # Reload firewall
-            ["sudo", "firewall-cmd", "--reload"],
-        ]
-        
-        for cmd in commands:
-            try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                if result.returncode != 0:
-                    print(f"⚠ Warning: {' '.join(cmd)} failed: {result.stderr}")
-            except Exception as e:
-                print(f"⚠ Warning configuring firewalld: {e}")
-        
-        # Check firewalld status
-        status_cmd = ["sudo", "firewall-cmd", "--list-all"]
-        result = subprocess.run(status_cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print("✓ firewalld configured successfully")
-            print(result.stdout)
-            return True
-        else:
-            print("✗ Failed to get firewalld status")
-            return False
+        return self._configure_firewall_batch("firewalld", self._firewalld_commands(), "firewall-cmd --list-all")
     
-    def configure_firewall_cluster_pdsh(self) -> bool:
+    def configure_firewall_cluster_pdsh(self, fail_fast: bool = False) -> bool:
         """
         Configure firewall on all cluster nodes using pdsh.
         
+        The firewall is detected once, on this node, and the same
+        configuration script is sent to every other node: the cluster is
+        assumed to be homogeneous (all ufw or all firewalld), so remote nodes
+        are never probed.
+        
+        Args:
+            fail_fast: Stop at the first node that fails instead of waiting
+                for every node to finish or time out
+        
         Returns:
             bool: True if configuration successful on all nodes, False otherwise
         """
         print("\n=== Configuring Firewall cluster-wide ===")
         
+        firewall_type = self.detect_firewall_type()
+        
         # Configure locally first
-        if not self.configure_firewall_local():
+        if not self.configure_firewall_local(firewall_type):
             print("Failed to configure firewall locally")
             return False
         
@@ -230,91 +295,52 @@ class NetworkManager:
             print("No other nodes to configure")
             return True
         
-        firewall_type = self.detect_firewall_type()
+        self.setup_ssh_keys(other_nodes)
+        
+        if firewall_type == "ufw":
+            config_script = self._ufw_script
+        elif firewall_type == "firewalld":
+            config_script = self._firewalld_script
+        else:
+            for node_ip in other_nodes:
+                print(f"⚠ Skipping {node_ip} - no firewall support")
+            return True
+        
+        print(f"\nConfiguring firewall on {', '.join(other_nodes)}...")
+        
+        # Execute configuration script on all remote nodes at once
+        # Only the exit status and stderr matter here, so stdout is discarded
+        results = self._pdsh_exec(other_nodes, config_script, timeout=60,
+                                  capture_stdout=False, fail_fast=fail_fast)
         all_success = True
         
         for node_ip in other_nodes:
-            print(f"\nConfiguring firewall on {node_ip}...")
-            
-            if firewall_type == "ufw":
-                config_script = self._generate_ufw_script()
-            elif firewall_type == "firewalld":
-                config_script = self._generate_firewalld_script()
+            result = results[node_ip]
+            if result.returncode == 0:
+                print(f"✓ Firewall configured on {node_ip}")
             else:
-                print(f"⚠ Skipping {node_ip} - no firewall support")
-                continue
-            
-            # Execute configuration script on remote node
-            ssh_cmd = [
-                "sshpass", "-p", self.password,
-                "ssh", "-o", "StrictHostKeyChecking=no",
-                f"{self.username}@{node_ip}",
-                config_script
-            ]
-            
-            try:
-                result = subprocess.run(ssh_cmd, capture_output=True, text=True, timeout=60)
-                
-                if result.returncode == 0:
-                    print(f"✓ Firewall configured on {node_ip}")
-                else:
-                    print(f"✗ Failed to configure firewall on {node_ip}")
-                    all_success = False
-                    
-            except Exception as e:
-                print(f"✗ Error configuring firewall on {node_ip}: {e}")
+                print(f"✗ Failed to configure firewall on {node_ip}: {result.stderr.strip()}")
                 all_success = False
         
         return all_success
     
-    def _generate_ufw_script(self) -> str:
-        """
-        Generate UFW configuration script.
-        
-        Returns:
-            str: Shell script to configure UFW
-        """
-        script_lines = [
-            "set -e",
-            f"sudo ufw allow {self.ssh_port}",
-            f"sudo ufw allow {self.mpi_ports[0]}:{self.mpi_ports[1]}/tcp",
-            f"sudo ufw allow {self.mpi_ports[0]}:{self.mpi_ports[1]}/udp",
-        ]
-        
-        for port in self.slurm_ports:
-            script_lines.append(f"sudo ufw allow {port}")
-        
-        for ip in self.all_ips:
-            script_lines.append(f"sudo ufw allow from {ip}")
-        
-        script_lines.append("sudo ufw --force enable")
-        
-        return " && ".join(script_lines)
+    # The scripts and hosts entries depend only on the node list, so each is
+    # built once per manager no matter how many nodes it is sent to
     
-    def _generate_firewalld_script(self) -> str:
-        """
-        Generate firewalld configuration script.
-        
-        Returns:
-            str: Shell script to configure firewalld
-        """
-        script_lines = [
-            "set -e",
-            "sudo systemctl start firewalld",
-            "sudo firewall-cmd --permanent --add-service=ssh",
-            f"sudo firewall-cmd --permanent --add-port={self.mpi_ports[0]}-{self.mpi_ports[1]}/tcp",
-            f"sudo firewall-cmd --permanent --add-port={self.mpi_ports[0]}-{self.mpi_ports[1]}/udp",
-        ]
-        
-        for port in self.slurm_ports:
-            script_lines.append(f"sudo firewall-cmd --permanent --add-port={port}/tcp")
-        
-        for ip in self.all_ips:
-            script_lines.append(f"sudo firewall-cmd --permanent --zone=trusted --add-source={ip}")
-        
-        script_lines.append("sudo firewall-cmd --reload")
-        
-        return " && ".join(script_lines)
+    @functools.cached_property
+    def _ufw_script(self) -> str:
+        """UFW configuration script for remote nodes"""
+        return " && ".join(["set -e"] + [f"sudo {cmd}" for cmd in self._ufw_commands()])
+    
+    @functools.cached_property
+    def _firewalld_script(self) -> str:
+        """firewalld configuration script for remote nodes"""
+        return " && ".join(["set -e"] + [f"sudo {cmd}" for cmd in self._firewalld_commands()])
+    
+    @functools.cached_property
+    def _hosts_content(self) -> str:
+        """/etc/hosts entries for all cluster nodes"""
+        return "".join(f"{ip}\t{hostname}\n" for ip, hostname in self.node_hostnames.items())
     
     def update_hosts_file_local(self) -> bool:
         """
@@ -325,29 +351,20 @@ class NetworkManager:
         """
         print("\n=== Updating /etc/hosts locally ===")
         
-        hosts_entries = []
-        
-        for ip, hostname in self.node_hostnames.items():
-            hosts_entries.append(f"{ip}\t{hostname}")
-        
-        # Create temporary hosts file addition
-        temp_hosts = Path("/tmp/cluster_hosts")
-        temp_hosts.write_text("\n".join(hosts_entries) + "\n")
+        hosts_content = self._hosts_content
         
         # Append to /etc/hosts if entries don't already exist
-        check_cmd = ["grep", "-q", self.master_ip, "/etc/hosts"]
-        check_result = subprocess.run(check_cmd, capture_output=True)
-        
-        if check_result.returncode != 0:
-            # Entries don't exist, append them
-            append_cmd = f"sudo sh -c 'cat /tmp/cluster_hosts >> /etc/hosts'"
+        if not self._hosts_has_master(Path("/etc/hosts")):
+            # Entries don't exist; pipe them straight into tee (no temp file, no shell)
+            append_cmd = ["sudo", "tee", "-a", "/etc/hosts"]
             
             try:
-                result = subprocess.run(append_cmd, shell=True, capture_output=True, text=True)
+                result = subprocess.run(append_cmd, input=hosts_content, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE, text=True)
                 
                 if result.returncode == 0:
                     print("✓ /etc/hosts updated successfully")
-                    print(f"Added entries:\n{temp_hosts.read_text()}")
+                    print(f"Added entries:\n{hosts_content}")
                     return True
                 else:
                     print(f"✗ Failed to update /etc/hosts: {result.stderr}")
@@ -360,10 +377,31 @@ class NetworkManager:
             print("✓ /etc/hosts already contains cluster entries")
             return True
     
-    def update_hosts_file_cluster_pdsh(self) -> bool:
+    def _hosts_has_master(self, hosts_file: Path) -> bool:
+        """
+        Check whether a hosts file already has an entry for the master IP.
+        
+        Args:
+            hosts_file: Path to the hosts file
+            
+        Returns:
+            bool: True if a line starts with the master IP
+        """
+        try:
+            content = hosts_file.read_text()
+        except OSError:
+            return False
+        pattern = re.compile(rf'^\s*{re.escape(self.master_ip)}\s', re.MULTILINE)
+        return pattern.search(content) is not None
+    
+    def update_hosts_file_cluster_pdsh(self, fail_fast: bool = False) -> bool:
         """
         Update /etc/hosts on all cluster nodes using pdsh.
         
+        Args:
+            fail_fast: Stop at the first node that fails instead of waiting
+                for every node to finish or time out
+        
         Returns:
             bool: True if update successful on all nodes, False otherwise
         """
@@ -381,50 +419,36 @@ class NetworkManager:
             print("No other nodes to update")
             return True
         
-        # Create hosts entries content
-        hosts_entries = []
-        for ip, hostname in self.node_hostnames.items():
-            hosts_entries.append(f"{ip}\t{hostname}")
-        
-        hosts_content = "\n".join(hosts_entries)
+        self.setup_ssh_keys(other_nodes)
+        
+        # Check and update in the same SSH session: append the entries only
+        # if the master is not already listed. The entries travel on ssh's
+        # stdin (pdsh cannot forward stdin), so nothing is quoted into the
+        # command line.
+        # The master check matches _hosts_has_master: the IP, escaped, at
+        # the start of a line, so 192.168.1.1 does not match 192.168.1.10.
+        master_pattern = shlex.quote(
+            "^[[:space:]]*" + self.master_ip.replace(".", "\\.") + "[[:space:]]"
+        )
+        update_script = (
+            f"if grep -q {master_pattern} /etc/hosts; then echo present; "
+            f"else sudo tee -a /etc/hosts > /dev/null; fi"
+        )
+        
+        print(f"\nUpdating /etc/hosts on {', '.join(other_nodes)}...")
+        results = self._run_ssh_parallel(other_nodes, update_script, timeout=30,
+                                         input=self._hosts_content, fail_fast=fail_fast)
         all_success = True
         
         for node_ip in other_nodes:
-            print(f"\nUpdating /etc/hosts on {node_ip}...")
-            
-            # Check if entries already exist
-            check_cmd = [
-                "sshpass", "-p", self.password,
-                "ssh", "-o", "StrictHostKeyChecking=no",
-                f"{self.username}@{node_ip}",
-                f"grep -q {self.master_ip} /etc/hosts"
-            ]
-            
-            check_result = subprocess.run(check_cmd, capture_output=True)
-            
-            if check_result.returncode != 0:
-                # Entries don't exist, add them
-                update_cmd = [
-                    "sshpass", "-p", self.password,
-                    "ssh", "-o", "StrictHostKeyChecking=no",
-                    f"{self.username}@{node_ip}",
-                    f"echo '{hosts_content}' | sudo tee -a /etc/hosts > /dev/null"
-                ]
-                
-                try:
-                    result = subprocess.run(update_cmd, capture_output=True, text=True, timeout=30)
-                    
-                    if result.returncode == 0:
-                        print(f"✓ /etc/hosts updated on {node_ip}")
-                    else:
-                        print(f"✗ Failed to update /etc/hosts on {node_ip}")
-                        all_success = False
-                        
-                except Exception as e:
-                    print(f"✗ Error updating /etc/hosts on {node_ip}: {e}")
-                    all_success = False
-            else:
+            result = results[node_ip]
+            if result.returncode != 0:
+                print(f"✗ Failed to update /etc/hosts on {node_ip}: {result.stderr.strip()}")
+                all_success = False
+            elif result.stdout.strip() == "present":
                 print(f"✓ /etc/hosts already contains entries on {node_ip}")
+            else:
+                print(f"✓ /etc/hosts updated on {node_ip}")
         
         return all_success
     
@@ -437,46 +461,227 @@ class NetworkManager:
         """
         print("\n=== Testing Network Connectivity ===")
         
+        def ping(ip: str) -> Tuple[bool, Optional[Exception]]:
+            ping_cmd = ["ping", "-c", "3", "-W", "2", ip]
+            try:
+                result = subprocess.run(ping_cmd, capture_output=True, text=True, timeout=10)
+                return result.returncode == 0, None
+            except Exception as e:
+                return False, e
+        
+        # All nodes are pinged at once; results are reported in node order
+        with ThreadPoolExecutor(max_workers=min(MAX_SSH_FANOUT, len(self.all_ips))) as executor:
+            outcomes = list(executor.map(ping, self.all_ips))
+        
         all_reachable = True
         
-        for ip in self.all_ips:
+        for ip, (reachable, error) in zip(self.all_ips, outcomes):
             hostname = self.node_hostnames.get(ip, ip)
             print(f"\nPinging {hostname} ({ip})...")
             
-            ping_cmd = ["ping", "-c", "3", "-W", "2", ip]
-            
-            try:
-                result = subprocess.run(ping_cmd, capture_output=True, text=True, timeout=10)
-                
-                if result.returncode == 0:
-                    print(f"✓ {hostname} is reachable")
-                else:
-                    print(f"✗ {hostname} is NOT reachable")
-                    all_reachable = False
-                    
-            except Exception as e:
-                print(f"✗ Error pinging {hostname}: {e}")
+            if error is not None:
+                print(f"✗ Error pinging {hostname}: {error}")
+                all_reachable = False
+            elif reachable:
+                print(f"✓ {hostname} is reachable")
+            else:
+                print(f"✗ {hostname} is NOT reachable")
                 all_reachable = False
         
         return all_reachable
     
-    def _get_local_ip(self) -> Optional[str]:
+    def _run_ssh_parallel(self, nodes: List[str], remote_cmd: str, timeout: int = 60,
+                          input: Optional[str] = None, capture_stdout: bool = True,
+                          fail_fast: bool = False) -> Dict[str, subprocess.CompletedProcess]:
+        """
+        Run the same remote command on several nodes concurrently.
+        
+        The ssh children are awaited from a single asyncio event loop rather
+        than one blocked thread each, with at most MAX_SSH_FANOUT running.
+        
+        Args:
+            nodes: Node IPs to run on
+            remote_cmd: Command string for the remote shell
+            timeout: Per-node timeout in seconds
+            input: Text sent to the remote command's stdin on every node
+            capture_stdout: Keep each node's stdout; when False it is sent to
+                /dev/null and only stderr is buffered
+            fail_fast: Cancel the remaining nodes as soon as one fails
+            
+        Returns:
+            Dict[str, subprocess.CompletedProcess]: Result per node IP. A node
+            whose ssh could not be run, timed out or was cancelled gets
+            returncode -1 with the reason in stderr.
+        """
+        if not nodes:
+            return {}
+        
+        async def fan_out() -> List[subprocess.CompletedProcess]:
+            limit = asyncio.Semaphore(MAX_SSH_FANOUT)
+            tasks = [
+                asyncio.create_task(
+                    self._ssh_async(node_ip, remote_cmd, timeout, limit, input, capture_stdout)
+                )
+                for node_ip in nodes
+            ]
+            
+            if fail_fast:
+                for finished in asyncio.as_completed(tasks):
+                    if (await finished).returncode != 0:
+                        for task in tasks:
+                            task.cancel()
+                        break
+            
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            return [
+                subprocess.CompletedProcess(
+                    self._ssh_command(node_ip, remote_cmd), -1,
+                    stdout="", stderr="cancelled after another node failed"
+                ) if isinstance(result, asyncio.CancelledError) else result
+                for node_ip, result in zip(nodes, results)
+            ]
+        
+        return dict(zip(nodes, asyncio.run(fan_out())))
+    
+    async def _ssh_async(self, node_ip: str, remote_cmd: str, timeout: int,
+                         limit: asyncio.Semaphore,
+                         input: Optional[str] = None,
+                         capture_stdout: bool = True) -> subprocess.CompletedProcess:
+        """
+        Run a remote command over ssh without blocking the event loop.
+        
+        Args:
+            node_ip: IP address of the remote node
+            remote_cmd: Command string for the remote shell
+            timeout: Timeout in seconds
+            limit: Semaphore bounding the number of concurrent ssh processes
+            input: Text sent to the remote command's stdin
+            capture_stdout: Keep stdout; when False it goes to /dev/null
+            
+        Returns:
+            subprocess.CompletedProcess: Result, returncode -1 on error/timeout
+        """
+        cmd = self._ssh_command(node_ip, remote_cmd)
+        
+        async with limit:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=asyncio.subprocess.DEVNULL if input is None else asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except Exception as e:
+                return subprocess.CompletedProcess(cmd, -1, stdout="", stderr=str(e))
+            
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(None if input is None else input.encode()), timeout
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                return subprocess.CompletedProcess(
+                    cmd, -1, stdout="", stderr=f"timed out after {timeout} seconds"
+                )
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                raise
+        
+        return subprocess.CompletedProcess(
+            cmd, proc.returncode,
+            stdout=stdout.decode(errors="replace") if stdout else "",
+            stderr=stderr.decode(errors="replace")
+        )
+    
+    def _pdsh_exec(self, nodes: List[str], script: str, timeout: int = 60,
+                   capture_stdout: bool = True,
+                   fail_fast: bool = False) -> Dict[str, subprocess.CompletedProcess]:
         """
-        Get local node IP address.
+        Run a script on several nodes with a single pdsh invocation.
         
+        pdsh needs key-based SSH, so nodes it could not reach (and every
+        node, if pdsh is missing or times out) are retried through
+        _run_ssh_parallel, which authenticates with the password. Only
+        transport failures are retried: ssh's own exit status 255 or a
+        pdsh connect error. A script that ran and failed is reported as is,
+        so its side effects never happen twice.
+        
+        Args:
+            nodes: Node IPs to run on
+            script: Command string for the remote shell
+            timeout: Timeout in seconds for the whole pdsh run
+            capture_stdout: Keep each node's stdout; when False it is sent to
+                /dev/null and only stderr (which carries the exit status
+                lines) is buffered
+            fail_fast: Cancel the remaining ssh retries as soon as one fails
+            
         Returns:
-            Optional[str]: Local IP address or None if not found
+            Dict[str, subprocess.CompletedProcess]: Result per node IP
         """
+        if not nodes:
+            return {}
+        
+        pdsh_cmd = [
+            "pdsh",
+            "-R", "ssh",
+            "-l", self.username,
+            "-f", str(MAX_SSH_FANOUT),
+            "-w", ",".join(nodes),
+            script
+        ]
+        
         try:
-            hostname_result = subprocess.run(["hostname", "-I"], capture_output=True, text=True)
-            if hostname_result.returncode == 0:
-                local_ips = hostname_result.stdout.strip().split()
-                for ip in local_ips:
-                    if ip in self.all_ips:
-                        return ip
-            return self.master_ip
-        except Exception:
-            return self.master_ip
+            result = subprocess.run(
+                pdsh_cmd,
+                stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True, timeout=timeout, env=pdsh_env()
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+            print(f"⚠ pdsh failed ({e}), falling back to ssh")
+            return self._run_ssh_parallel(nodes, script, timeout,
+                                          capture_stdout=capture_stdout, fail_fast=fail_fast)
+        
+        # Demultiplex "host: line" output back into per-node results
+        stdout = {node_ip: [] for node_ip in nodes}
+        stderr = {node_ip: [] for node_ip in nodes}
+        returncodes = dict.fromkeys(nodes, 0)
+        
+        for line in (result.stdout or "").splitlines():
+            host, _, text = line.partition(": ")
+            if host in stdout:
+                stdout[host].append(text)
+        
+        for line in result.stderr.splitlines():
+            match = _PDSH_STATUS_RE.match(line)
+            if match and match.group(1) in returncodes:
+                code = _PDSH_EXIT_CODE_RE.search(match.group(2))
+                returncodes[match.group(1)] = int(code.group(1)) if code else 255
+                stderr[match.group(1)].append(match.group(2))
+                continue
+            host, _, text = line.partition(": ")
+            if host in stderr:
+                stderr[host].append(text)
+        
+        results = {
+            node_ip: subprocess.CompletedProcess(
+                pdsh_cmd, returncodes[node_ip],
+                stdout="\n".join(stdout[node_ip]),
+                stderr="\n".join(stderr[node_ip])
+            )
+            for node_ip in nodes
+        }
+        
+        unreachable = [node_ip for node_ip in nodes if returncodes[node_ip] == 255]
+        if unreachable:
+            print(f"⚠ pdsh could not reach {', '.join(unreachable)}, retrying with ssh")
+            results.update(self._run_ssh_parallel(unreachable, script, timeout,
+                                                  capture_stdout=capture_stdout,
+                                                  fail_fast=fail_fast))
+        
+        return results
 
 
 if __name__ == "__main__":
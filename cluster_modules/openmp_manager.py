@@ -11,14 +11,22 @@ Author: Olumuyiwa Oluwasanmi
 Date: November 4, 2025
 """
 
+import functools
 import subprocess
 import os
 import re
+import shlex
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional, List, Tuple
 
+from .core import MAX_SSH_FANOUT, RemoteNodeMixin, pdsh_env
 
-class OpenMPManager:
+# Variables the test binary inherits; the library paths let it find libomp
+_TEST_ENV_PASSTHROUGH = ("PATH", "HOME", "LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH")
+
+
+class OpenMPManager(RemoteNodeMixin):
     """
     Manages OpenMP configuration and testing across the cluster.
     
@@ -103,6 +111,8 @@ class OpenMPManager:
             print("No other nodes to install on")
             return True
         
+        self.setup_ssh_keys(other_nodes)
+        
         # Try pdsh for parallel installation
         node_list = ",".join(other_nodes)
         
@@ -116,7 +126,9 @@ class OpenMPManager:
         print(f"Installing libomp on nodes: {node_list}")
         
         try:
-            result = subprocess.run(pdsh_cmd, capture_output=True, text=True, timeout=900)
+            # Let pdsh's ssh reuse (or leave behind) multiplexed connections
+            result = subprocess.run(pdsh_cmd, capture_output=True, text=True, timeout=900,
+                                    env=pdsh_env())
             
             if result.returncode == 0:
                 print("✓ libomp installed successfully on all nodes")
@@ -144,12 +156,7 @@ class OpenMPManager:
         for node_ip in nodes:
             print(f"\nInstalling libomp on {node_ip}...")
             
-            ssh_cmd = [
-                "sshpass", "-p", self.password,
-                "ssh", "-o", "StrictHostKeyChecking=no",
-                f"{self.username}@{node_ip}",
-                "brew install libomp"
-            ]
+            ssh_cmd = self._ssh_command(node_ip, "brew install libomp")
             
             try:
                 result = subprocess.run(ssh_cmd, capture_output=True, text=True, timeout=600)
@@ -166,6 +173,25 @@ class OpenMPManager:
         
         return all_success
     
+    @functools.cached_property
+    def _libomp_prefix(self) -> str:
+        """libomp install prefix, resolved once per manager"""
+        # $HOMEBREW_PREFIX (set by `brew shellenv`) avoids starting brew at all
+        homebrew_prefix = os.environ.get("HOMEBREW_PREFIX")
+        if homebrew_prefix and os.path.isdir(f"{homebrew_prefix}/opt/libomp"):
+            return f"{homebrew_prefix}/opt/libomp"
+        
+        try:
+            libomp_prefix = subprocess.run(
+                ["brew", "--prefix", "libomp"],
+                capture_output=True,
+                text=True
+            ).stdout.strip()
+        except OSError:
+            libomp_prefix = ""
+        
+        return libomp_prefix or "/home/linuxbrew/.linuxbrew/opt/libomp"
+    
     def get_openmp_compiler_flags(self) -> Tuple[str, str]:
         """
         Get OpenMP compiler flags for GCC.
@@ -173,32 +199,20 @@ class OpenMPManager:
         Returns:
             Tuple[str, str]: (CFLAGS, LDFLAGS) for OpenMP
         """
-        libomp_prefix = subprocess.run(
-            ["brew", "--prefix", "libomp"],
-            capture_output=True,
-            text=True
-        ).stdout.strip()
-        
-        if not libomp_prefix:
-            libomp_prefix = "/home/linuxbrew/.linuxbrew/opt/libomp"
+        libomp_prefix = self._libomp_prefix
         
         cflags = f"-fopenmp -I{libomp_prefix}/include"
         ldflags = f"-L{libomp_prefix}/lib -lomp"
         
         return cflags, ldflags
     
-    def test_openmp_local(self, num_threads: int = 4) -> bool:
+    def _build_openmp_test(self) -> Optional[Path]:
         """
-        Test OpenMP functionality on local node.
+        Compile the OpenMP test program on the local node.
         
-        Args:
-            num_threads: Number of threads to test with
-            
         Returns:
-            bool: True if test successful, False otherwise
+            Optional[Path]: Path to the test binary, or None if compilation failed
         """
-        print(f"\nTesting OpenMP with {num_threads} threads...")
-        
         # Create test program
         test_code = """
 #include <stdio.h>
@@ -226,10 +240,11 @@ int main() {
         cflags, ldflags = self.get_openmp_compiler_flags()
         
         # Compile test program
+        binary = test_dir / "test_openmp"
         compile_cmd = [
             "gcc",
             str(test_file),
-            "-o", str(test_dir / "test_openmp"),
+            "-o", str(binary),
             *cflags.split(),
             *ldflags.split()
         ]
@@ -239,24 +254,36 @@ int main() {
         
         if result.returncode != 0:
             print(f"✗ Compilation failed: {result.stderr}")
-            return False
+            return None
         
         print("✓ Compilation successful")
+        return binary
+    
+    def _run_openmp_test(self, binary: Path, num_threads: int) -> bool:
+        """
+        Run a compiled OpenMP test program on the local node.
         
-        # Run test program
-        env = {"OMP_NUM_THREADS": str(num_threads)}
-        run_cmd = [str(test_dir / "test_openmp")]
+        Args:
+            binary: Path to the test binary
+            num_threads: Number of threads to test with
+            
+        Returns:
+            bool: True if test successful, False otherwise
+        """
+        # Run test program with a minimal environment instead of a copy of ours
+        env = {name: os.environ[name] for name in _TEST_ENV_PASSTHROUGH if name in os.environ}
+        env["OMP_NUM_THREADS"] = str(num_threads)
+        run_cmd = [str(binary)]
         
         print("Running OpenMP test program...")
-        result = subprocess.run(run_cmd, capture_output=True, text=True, env={**os.environ, **env})
+        result = subprocess.run(run_cmd, capture_output=True, text=True, env=env)
         
         if result.returncode != 0:
             print(f"✗ Execution failed: {result.stderr}")
             return False
         
-        # Check output
-        output_lines = result.stdout.strip().split('\n')
-        thread_count = len(output_lines)
+        # Each thread prints exactly one "Thread %d of %d" line
+        thread_count = result.stdout.count("Thread ")
         
         if thread_count == num_threads:
             print(f"✓ OpenMP test successful: {thread_count} threads executed")
@@ -266,100 +293,131 @@ int main() {
             print(f"✗ Expected {num_threads} threads, got {thread_count}")
             return False
     
-    def test_openmp_cluster(self, num_threads: int = 4) -> bool:
+    def test_openmp_local(self, num_threads: int = 4) -> bool:
         """
-        Test OpenMP on all cluster nodes.
+        Test OpenMP functionality on local node.
         
         Args:
             num_threads: Number of threads to test with
             
         Returns:
-            bool: True if all tests successful, False otherwise
+            bool: True if test successful, False otherwise
         """
-        print("\n=== Testing OpenMP cluster-wide ===")
+        print(f"\nTesting OpenMP with {num_threads} threads...")
         
-        all_success = True
+        binary = self._build_openmp_test()
+        if binary is None:
+            return False
         
-        for node_ip in self.all_ips:
-            print(f"\nTesting OpenMP on {node_ip}...")
-            
-            # For local node, test directly
-            if node_ip == self._get_local_ip():
-                if not self.test_openmp_local(num_threads):
-                    all_success = False
-                continue
-            
-            # For remote nodes, test via SSH
-            test_cmd = f"""
-mkdir -p ~/openmp_test
-cat > ~/openmp_test/test_openmp.c << 'EOF'
-#include <stdio.h>
-#include <omp.h>
-
-int main() {{
-    #pragma omp parallel
-    {{
-        int thread_id = omp_get_thread_num();
-        int total_threads = omp_get_num_threads();
-        #pragma omp critical
-        printf("Thread %d of %d\\\\n", thread_id, total_threads);
-    }}
-    return 0;
-}}
-EOF
-
-gcc ~/openmp_test/test_openmp.c -o ~/openmp_test/test_openmp -fopenmp -I$(brew --prefix libomp)/include -L$(brew --prefix libomp)/lib -lomp
-OMP_NUM_THREADS={num_threads} ~/openmp_test/test_openmp
-"""
+        return self._run_openmp_test(binary, num_threads)
+    
+    def _test_openmp_remote(self, node_ip: str, binary: Path, num_threads: int) -> Tuple[bool, str]:
+        """
+        Copy the locally built test binary to a node and run it there.
+        
+        Args:
+            node_ip: IP address of the remote node
+            binary: Path to the local test binary
+            num_threads: Number of threads to test with
             
-            ssh_cmd = [
-                "sshpass", "-p", self.password,
-                "ssh", "-o", "StrictHostKeyChecking=no",
-                f"{self.username}@{node_ip}",
-                test_cmd
-            ]
+        Returns:
+            Tuple[bool, str]: (success, message to report)
+        """
+        copy_cmd = [
+            "rsync", "-az",
+            # Older rsync (before 3.2.3) has no --mkpath
+            "--rsync-path", "mkdir -p openmp_test && rsync",
+            "-e", shlex.join(self._ssh_transport(node_ip)),
+            str(binary),
+            f"{self.username}@{node_ip}:openmp_test/"
+        ]
+        run_cmd = self._ssh_command(node_ip, f"OMP_NUM_THREADS={num_threads} ~/openmp_test/{binary.name}")
+        
+        try:
+            result = subprocess.run(copy_cmd, capture_output=True, text=True, timeout=60)
+            if result.returncode != 0:
+                return False, f"✗ Failed to copy OpenMP test to {node_ip}: {result.stderr}"
             
-            try:
-                result = subprocess.run(ssh_cmd, capture_output=True, text=True, timeout=60)
-                
-                if result.returncode == 0:
-                    output_lines = result.stdout.strip().split('\n')
-                    thread_count = len([line for line in output_lines if "Thread" in line])
-                    
-                    if thread_count == num_threads:
-                        print(f"✓ OpenMP test successful on {node_ip}: {thread_count} threads")
-                    else:
-                        print(f"✗ Expected {num_threads} threads on {node_ip}, got {thread_count}")
-                        all_success = False
-                else:
-                    print(f"✗ OpenMP test failed on {node_ip}: {result.stderr}")
-                    all_success = False
-                    
-            except Exception as e:
-                print(f"✗ Error testing OpenMP on {node_ip}: {e}")
-                all_success = False
+            result = subprocess.run(run_cmd, capture_output=True, text=True, timeout=60)
+        except Exception as e:
+            return False, f"✗ Error testing OpenMP on {node_ip}: {e}"
         
-        return all_success
+        if result.returncode != 0:
+            return False, f"✗ OpenMP test failed on {node_ip}: {result.stderr}"
+        
+        thread_count = result.stdout.count("Thread ")
+        
+        if thread_count == num_threads:
+            return True, f"✓ OpenMP test successful on {node_ip}: {thread_count} threads"
+        return False, f"✗ Expected {num_threads} threads on {node_ip}, got {thread_count}"
     
-    def _get_local_ip(self) -> Optional[str]:
+    def test_openmp_cluster(self, num_threads: int = 4, fail_fast: bool = False) -> bool:
         """
-        Get local node IP address.
+        Test OpenMP on all cluster nodes.
+        
+        The test program is compiled once on this node and the binary is
+        copied to the others (which share the Homebrew toolchain layout),
+        so no node has to run the compiler itself.
         
+        Args:
+            num_threads: Number of threads to test with
+            fail_fast: Stop at the first node that fails; nodes whose test
+                has not started yet are skipped
+            
         Returns:
-            Optional[str]: Local IP address or None if not found
+            bool: True if all tests successful, False otherwise
         """
-        try:
-            # Try to get IP from hostname
-            hostname_result = subprocess.run(["hostname", "-I"], capture_output=True, text=True)
-            if hostname_result.returncode == 0:
-                local_ips = hostname_result.stdout.strip().split()
-                # Check if any local IP matches cluster IPs
-                for ip in local_ips:
-                    if ip in self.all_ips:
-                        return ip
-            
-            # Default to master if can't determine
-            return self.master_ip
+        print("\n=== Testing OpenMP cluster-wide ===")
+        
+        local_ip = self._get_local_ip()
+        print(f"\nTesting OpenMP on {local_ip}...")
+        
+        binary = self._build_openmp_test()
+        if binary is None:
+            return False
+        
+        all_success = self._run_openmp_test(binary, num_threads)
+        if fail_fast and not all_success:
+            return False
+        
+        remote_nodes = [ip for ip in self.all_ips if ip != local_ip]
+        if not remote_nodes:
+            return all_success
+        
+        self.setup_ssh_keys(remote_nodes)
+        
+        print(f"\nTesting OpenMP on {', '.join(remote_nodes)}...")
+        with ThreadPoolExecutor(max_workers=min(len(remote_nodes), MAX_SSH_FANOUT)) as executor:
+            futures = {
+                executor.submit(self._test_openmp_remote, node_ip, binary, num_threads): node_ip
+                for node_ip in remote_nodes
+            }
             
-        except Exception:
-            return self.master_ip
+            unreported = set(futures)
+            for future in as_completed(futures):
+                unreported.discard(future)
+                success, message = future.result()
+                print(message)
+                all_success = all_success and success
+                
+                if fail_fast and not success:
+                    # Queued tests never start; running ones still finish
+                    executor.shutdown(cancel_futures=True)
+                    break
+        
+        # Left over only after a fail-fast stop
+        skipped = []
+        for future, node_ip in futures.items():
+            if future not in unreported:
+                continue
+            if future.cancelled():
+                skipped.append(node_ip)
+            else:
+                success, message = future.result()
+                print(message)
+                all_success = all_success and success
+        
+        if skipped:
+            print(f"⚠ Skipped OpenMP test on {', '.join(skipped)} after a failure")
+        
+        return all_success
@@ -11,9 +11,39 @@ Author: Olumuyiwa Oluwasanmi
 Date: November 4, 2025
 """
 
+import asyncio
+import functools
+import os
+import shlex
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from .core import MAX_SSH_FANOUT, SSH_MUX_OPTS
+from .installer_base import update_bashrc
+
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None  # Fall back to ssh subprocesses
+
+# Non-interactive, multiplexed ssh for the per-node install commands
+_SSH_OPTS = ("-o", "BatchMode=yes", "-o", "ConnectTimeout=10", *SSH_MUX_OPTS)
+
+# Installs pdsh with Homebrew if present, else the system package manager
+# (requires sudo); run in a login shell so Homebrew's PATH is set up
+_INSTALL_PDSH_SCRIPT = (
+    "if command -v brew >/dev/null; then brew install pdsh; "
+    "else sudo apt-get install -y pdsh || sudo yum install -y pdsh || sudo dnf install -y pdsh; fi"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _which(program: str) -> bool:
+    """Whether a program is on PATH (cached; see invalidate_install_cache)"""
+    return shutil.which(program) is not None
 
 
 class PDSHManager:
@@ -29,6 +59,8 @@ class PDSHManager:
         master_ip (str): Master node IP address
         worker_ips (List[str]): List of worker node IP addresses
         all_ips (List[str]): All cluster node IPs
+        use_pdsh_binary (bool): Run commands through pdsh when it is installed
+            (otherwise through concurrent SSH sessions, see _exec_on_hosts)
     """
     
     def __init__(self, username: str, password: str, master_ip: str, worker_ips: List[str]):
@@ -46,20 +78,27 @@ class PDSHManager:
         self.master_ip = master_ip
         self.worker_ips = worker_ips
         self.all_ips = [master_ip] + worker_ips
+        self.use_pdsh_binary = True
+        
+        # asyncssh connection pool, kept open for the manager's lifetime
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ssh_conns: Dict[str, Any] = {}
     
     def is_pdsh_installed(self) -> bool:
         """
         Check if pdsh is installed on the local system.
         
+        The result is cached for the process, since several setup steps
+        ask and the answer only changes when pdsh is installed here.
+        
         Returns:
             bool: True if pdsh is installed, False otherwise
         """
-        try:
-            result = subprocess.run(['which', 'pdsh'], 
-                                  capture_output=True, text=True)
-            return result.returncode == 0
-        except Exception:
-            return False
+        return _which('pdsh')
+    
+    def invalidate_install_cache(self):
+        """Forget cached pdsh/Homebrew lookups, e.g. after installing pdsh"""
+        _which.cache_clear()
     
     def install_pdsh_local(self) -> bool:
         """
@@ -74,12 +113,15 @@ class PDSHManager:
             print("✓ pdsh is already installed")
             return True
         
-        # Try Homebrew first (works on macOS and Linux)
+        # Try Homebrew first (works on macOS and Linux), else the system package manager
         if self._is_homebrew_available():
-            return self._install_pdsh_homebrew()
+            installed = self._install_pdsh_homebrew()
+        else:
+            installed = self._install_pdsh_system()
         
-        # Try system package manager
-        return self._install_pdsh_system()
+        if installed:
+            self.invalidate_install_cache()
+        return installed
     
     def _is_homebrew_available(self) -> bool:
         """
@@ -88,12 +130,7 @@ class PDSHManager:
         Returns:
             bool: True if Homebrew is installed
         """
-        try:
-            result = subprocess.run(['which', 'brew'], 
-                                  capture_output=True, text=True)
-            return result.returncode == 0
-        except Exception:
-            return False
+        return _which('brew')
     
     def _install_pdsh_homebrew(self) -> bool:
         """
@@ -145,12 +182,7 @@ class PDSHManager:
         
         for cmd, name in pkg_managers:
             # Check if package manager exists
-            check_result = subprocess.run(
-                ['which', cmd[0]], 
-                capture_output=True
-            )
-            
-            if check_result.returncode == 0:
+            if shutil.which(cmd[0]) is not None:
                 print(f"Using {name}...")
                 try:
                     result = subprocess.run(
@@ -174,61 +206,44 @@ class PDSHManager:
         print("✗ No supported package manager found")
         return False
     
-    def install_pdsh_cluster_sequential(self) -> bool:
+    def install_pdsh_cluster(self) -> bool:
         """
-        Install pdsh on all cluster nodes sequentially using SSH.
+        Install pdsh on all cluster nodes over SSH, all nodes at once.
         Use this method for initial cluster setup before pdsh is available.
         
+        Detecting Homebrew and installing happen in one remote script, so
+        each node costs a single SSH session, and all nodes install
+        concurrently (see _exec_on_hosts).
+        
         Returns:
             bool: True if installation successful on all nodes, False otherwise
         """
-        print("\n=== Installing pdsh on Cluster (Sequential) ===")
+        print("\n=== Installing pdsh on Cluster ===")
         
-        success = True
+        results = self._exec_on_hosts(
+            f'bash -lc {shlex.quote(_INSTALL_PDSH_SCRIPT)}', self.all_ips, timeout=600
+        )
         
-        for ip in self.all_ips:
-            print(f"\nInstalling on {ip}...")
-            
-            try:
-                # Check if Homebrew is available
-                check_brew = subprocess.run(
-                    ['ssh', f'{self.username}@{ip}', 'which brew'],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if check_brew.returncode == 0:
-                    # Install via Homebrew
-                    cmd = ['ssh', f'{self.username}@{ip}', 'brew install pdsh']
-                else:
-                    # Try system package manager (requires sudo)
-                    cmd = ['ssh', f'{self.username}@{ip}', 
-                          'sudo apt-get install -y pdsh || sudo yum install -y pdsh || sudo dnf install -y pdsh']
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=600
-                )
-                
-                if result.returncode == 0:
-                    print(f"✓ Installed pdsh on {ip}")
-                else:
-                    print(f"✗ Failed to install pdsh on {ip}")
-                    print(f"  Error: {result.stderr}")
-                    success = False
-                    
-            except subprocess.TimeoutExpired:
-                print(f"✗ Installation timed out on {ip}")
-                success = False
-            except Exception as e:
-                print(f"✗ Error installing on {ip}: {e}")
+        success = True
+        for ip, (returncode, _, stderr) in zip(self.all_ips, results):
+            if returncode == 0:
+                print(f"✓ Installed pdsh on {ip}")
+            else:
+                print(f"✗ Failed to install pdsh on {ip}")
+                print(f"  Error: {stderr.strip()}")
                 success = False
         
         return success
     
+    def install_pdsh_cluster_sequential(self) -> bool:
+        """
+        Install pdsh on all cluster nodes (kept for existing callers).
+        
+        Returns:
+            bool: True if installation successful on all nodes, False otherwise
+        """
+        return self.install_pdsh_cluster()
+    
     def create_hostfile(self, hostfile_path: Optional[Path] = None) -> bool:
         """
         Create a hostfile for pdsh with all cluster nodes.
@@ -246,12 +261,24 @@ class PDSHManager:
             hostfile_path = Path.home() / ".pdsh" / "machines"
         
         try:
-            hostfile_path.parent.mkdir(parents=True, exist_ok=True)
+            payload = ('\n'.join(self.all_ips) + '\n').encode('ascii')
+            
+            # Leave an up-to-date hostfile untouched on re-runs
+            try:
+                unchanged = hostfile_path.read_bytes() == payload
+            except FileNotFoundError:
+                unchanged = False
             
-            # Write all node IPs to hostfile
-            with hostfile_path.open('w') as f:
-                for ip in self.all_ips:
-                    f.write(f"{ip}\n")
+            if unchanged:
+                print(f"✓ pdsh hostfile already up to date: {hostfile_path}")
+                print(f"  Nodes: {len(self.all_ips)}")
+                return True
+            
+            if not hostfile_path.parent.is_dir():
+                hostfile_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # Write all node IPs to hostfile in a single write
+            hostfile_path.write_bytes(payload)
             
             print(f"✓ Created pdsh hostfile: {hostfile_path}")
             print(f"  Nodes: {len(self.all_ips)}")
@@ -281,7 +308,8 @@ class PDSHManager:
                 ['pdsh', '-w', hosts, 'hostname'],
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=30,
+                env=self._pdsh_env()
             )
             
             if result.returncode == 0:
@@ -304,6 +332,12 @@ class PDSHManager:
         """
         Run a command on multiple hosts using pdsh.
         
+        SSH connections are multiplexed and kept open for a while, so
+        consecutive commands to the same hosts skip the SSH handshake.
+        Without pdsh (or with use_pdsh_binary off) the command runs over
+        concurrent SSH sessions (see _exec_on_hosts), with pdsh-style
+        "host: line" output.
+        
         Args:
             command: Command to execute on remote hosts
             hosts: Optional list of host IPs. Uses all_ips if not provided.
@@ -314,9 +348,8 @@ class PDSHManager:
         if hosts is None:
             hosts = self.all_ips
         
-        if not self.is_pdsh_installed():
-            print("✗ pdsh is not installed")
-            return None
+        if not (self.use_pdsh_binary and self.is_pdsh_installed()):
+            return self._run_ssh_command(command, hosts)
         
         try:
             hosts_str = ','.join(hosts)
@@ -325,7 +358,8 @@ class PDSHManager:
                 ['pdsh', '-w', hosts_str, command],
                 capture_output=True,
                 text=True,
-                timeout=300
+                timeout=300,
+                env=self._pdsh_env()
             )
             
             if result.returncode == 0:
@@ -341,6 +375,146 @@ class PDSHManager:
             print(f"✗ Error running pdsh command: {e}")
             return None
     
+    def _pdsh_env(self) -> Dict[str, str]:
+        """Environment for pdsh whose ssh connections are multiplexed"""
+        env = os.environ.copy()
+        ssh_args = env.get('PDSH_SSH_ARGS_APPEND', '')
+        env['PDSH_SSH_ARGS_APPEND'] = f"{ssh_args} {' '.join(_SSH_OPTS)}".strip()
+        return env
+    
+    def _run_ssh_command(self, command: str, hosts: List[str]) -> Optional[str]:
+        """
+        Run a command on hosts without pdsh.
+        
+        Args:
+            command: Command to execute on remote hosts
+            hosts: Host IPs
+            
+        Returns:
+            Optional[str]: Output as "host: line" lines if the command
+            succeeded on every host, None otherwise
+        """
+        results = self._exec_on_hosts(command, hosts, timeout=300)
+        
+        output, errors = [], []
+        for ip, (returncode, stdout, stderr) in zip(hosts, results):
+            output.extend(f"{ip}: {line}" for line in stdout.splitlines())
+            if returncode != 0:
+                errors.extend(f"{ip}: {line}" for line in stderr.splitlines() or [f"exit {returncode}"])
+        
+        if errors:
+            print("✗ Command failed:")
+            for line in errors:
+                print(f"  {line}")
+            return None
+        return "".join(line + "\n" for line in output)
+    
+    def _exec_on_hosts(self, command: str, hosts: List[str], timeout: int) -> List[Tuple[int, str, str]]:
+        """
+        Run a command on every host concurrently.
+        
+        With asyncssh installed all hosts are served from one event loop
+        over pooled connections that stay open for later commands, which
+        scales to hundreds of nodes without a thread per host. Otherwise
+        one multiplexed ssh subprocess per host runs from a thread pool.
+        
+        Args:
+            command: Command to execute on remote hosts
+            hosts: Host IPs
+            timeout: Timeout per host in seconds
+            
+        Returns:
+            List[Tuple[int, str, str]]: (returncode, stdout, stderr) per host,
+            in the order of hosts; returncode is -1 if the command could not run
+        """
+        if not hosts:
+            return []
+        
+        if asyncssh is not None:
+            return self._run_async(asyncio.gather(
+                *(self._remote_exec(ip, command, timeout) for ip in hosts)
+            ))
+        
+        with ThreadPoolExecutor(max_workers=min(len(hosts), MAX_SSH_FANOUT)) as executor:
+            return list(executor.map(lambda ip: self._ssh_exec(ip, command, timeout), hosts))
+    
+    def _ssh_exec(self, ip: str, command: str, timeout: int) -> Tuple[int, str, str]:
+        """Run a command on one host with a multiplexed ssh subprocess"""
+        try:
+            result = subprocess.run(
+                ['ssh', *_SSH_OPTS, f'{self.username}@{ip}', command],
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            return result.returncode, result.stdout, result.stderr
+        except subprocess.TimeoutExpired:
+            return -1, "", "timed out"
+        except Exception as e:
+            return -1, "", str(e)
+    
+    def _run_async(self, coro):
+        """Run a coroutine on the manager's own event loop
+        
+        asyncssh connections are bound to the loop that opened them, so a
+        single long-lived loop (instead of asyncio.run per call) lets pooled
+        connections be reused by later commands.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+    
+    async def _get_connection(self, ip: str):
+        """Get the pooled asyncssh connection for a host, opening it if needed"""
+        conn = self._ssh_conns.get(ip)
+        if conn is None:
+            # Host keys are checked against ~/.ssh/known_hosts (the asyncssh
+            # default), as the BatchMode ssh fallback does
+            conn = await asyncssh.connect(
+                ip,
+                username=self.username,
+                password=self.password or None,
+                connect_timeout=10,
+                keepalive_interval=30
+            )
+            self._ssh_conns[ip] = conn
+        return conn
+    
+    async def _remote_exec(self, ip: str, command: str, timeout: int) -> Tuple[int, str, str]:
+        """Run a command on one host over its pooled asyncssh connection"""
+        try:
+            conn = await self._get_connection(ip)
+            result = await asyncio.wait_for(conn.run(command), timeout=timeout)
+        except asyncio.TimeoutError:
+            return -1, "", "timed out"
+        except (OSError, asyncssh.Error) as e:
+            # Reconnect on the next command rather than reuse a broken connection
+            conn = self._ssh_conns.pop(ip, None)
+            if conn is not None:
+                conn.close()
+            return -1, "", str(e)
+        
+        returncode = result.exit_status if result.exit_status is not None else -1
+        return returncode, result.stdout or "", result.stderr or ""
+    
+    def close(self):
+        """Close pooled SSH connections and the event loop"""
+        if self._loop is None:
+            return
+        
+        async def _close_all():
+            for conn in self._ssh_conns.values():
+                conn.close()
+            await asyncio.gather(
+                *(conn.wait_closed() for conn in self._ssh_conns.values()),
+                return_exceptions=True
+            )
+        
+        self._loop.run_until_complete(_close_all())
+        self._ssh_conns.clear()
+        self._loop.close()
+        self._loop = None
+    
     def configure_pdsh_environment(self) -> bool:
         """
         Configure pdsh environment variables for optimal operation.
@@ -354,22 +528,18 @@ class PDSHManager:
         
         try:
             # Check if PDSH_RCMD_TYPE is already set
-            current_env = subprocess.run(
-                ['bash', '-c', 'echo $PDSH_RCMD_TYPE'],
-                capture_output=True,
-                text=True
-            )
-            
-            if current_env.stdout.strip() == 'ssh':
+            if os.environ.get('PDSH_RCMD_TYPE') == 'ssh':
                 print("✓ PDSH_RCMD_TYPE already set to ssh")
                 return True
             
-            # Add to shell profile
+            # Add to shell profile, unless an earlier run already did
             shell_profile = Path.home() / ".bashrc"
-            export_line = "export PDSH_RCMD_TYPE=ssh\n"
+            export_line = "export PDSH_RCMD_TYPE=ssh"
             
-            with shell_profile.open('a') as f:
-                f.write(f"\n# pdsh configuration\n{export_line}")
+            if not update_bashrc(["# pdsh configuration", export_line], export_line, shell_profile):
+                print(f"✓ PDSH_RCMD_TYPE=ssh already in {shell_profile}")
+                print("  Note: Restart shell or run: source ~/.bashrc")
+                return True
             
             print(f"✓ Added PDSH_RCMD_TYPE=ssh to {shell_profile}")
             print("  Note: Restart shell or run: source ~/.bashrc")
@@ -390,24 +560,54 @@ class PDSHManager:
         4. Configure environment
         5. Test connectivity
         
+        Steps 3 and 4 only touch local files, so they run while the
+        network-bound cluster install is in progress. The local install
+        finishes first, because the cluster install also reaches this
+        node and two package manager runs would contend for its lock.
+        
         Returns:
             bool: True if all steps successful, False otherwise
         """
         print("\n=== Complete PDSH Cluster Setup ===")
         
-        steps = [
-            ("Installing pdsh locally", self.install_pdsh_local),
-            ("Installing pdsh on cluster", self.install_pdsh_cluster_sequential),
+        print("\n--- Installing pdsh locally ---")
+        if not self.install_pdsh_local():
+            print("\n✗ Failed at step: Installing pdsh locally")
+            return False
+        
+        local_steps = [
             ("Creating hostfile", self.create_hostfile),
-            ("Configuring environment", self.configure_pdsh_environment),
-            ("Testing connectivity", self.test_pdsh_connectivity)
+            ("Configuring environment", self.configure_pdsh_environment)
         ]
         
-        for step_name, step_func in steps:
-            print(f"\n--- {step_name} ---")
-            if not step_func():
-                print(f"\n✗ Failed at step: {step_name}")
-                return False
+        try:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                print("\n--- Installing pdsh on cluster (in background) ---")
+                cluster_install = executor.submit(self.install_pdsh_cluster)
+                
+                failed_step = None
+                for step_name, step_func in local_steps:
+                    print(f"\n--- {step_name} ---")
+                    if not step_func():
+                        failed_step = step_name
+                        break
+                
+                cluster_installed = cluster_install.result()
+            
+            if failed_step is None and not cluster_installed:
+                failed_step = "Installing pdsh on cluster"
+            
+            if failed_step is None:
+                print("\n--- Testing connectivity ---")
+                if not self.test_pdsh_connectivity():
+                    failed_step = "Testing connectivity"
+        finally:
+            # Release the SSH connections pooled by the cluster steps
+            self.close()
+        
+        if failed_step is not None:
+            print(f"\n✗ Failed at step: {failed_step}")
+            return False
         
         print("\n✓ PDSH cluster setup completed successfully!")
         return True
@@ -9,8 +9,11 @@ Author: Olumuyiwa Oluwasanmi
 Date: November 4, 2025
 """
 
+import functools
+import os
 from pathlib import Path
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional, Tuple
 import subprocess
 
 
@@ -48,106 +51,140 @@ class PGASConfig:
     OPENSHMEM_SOURCE = Path.home() / "openshmem_build" / f"SOS-{OPENSHMEM_VERSION}"
     BERKELEY_UPC_SOURCE = BUILD_DIR / f"berkeley_upc-{BERKELEY_UPC_VERSION}"
     
+    # The getters below return read-only mappings built once from the
+    # constants above (see the module-level tables after the class)
+    
     @classmethod
-    def get_upcxx_flags(cls) -> Dict[str, str]:
+    def get_upcxx_flags(cls) -> Mapping[str, str]:
         """Get UPC++ compilation flags"""
-        return {
-            'UPCXX': str(cls.UPCXX_COMPILER),
-            'UPCXX_RUN': str(cls.UPCXX_RUN),
-            'UPCXX_FLAGS': '-O3 -std=c++23',
-        }
+        return _UPCXX_FLAGS
     
     @classmethod
-    def get_openshmem_flags(cls) -> Dict[str, str]:
+    def get_openshmem_flags(cls) -> Mapping[str, str]:
         """Get OpenSHMEM compilation flags"""
-        return {
-            'OSHCC': str(cls.OSHCC),
-            'OSHCXX': str(cls.OSHCXX),
-            'OSHRUN': str(cls.OSHRUN),
-            'OSHCC_FLAGS': '-std=c++23 -O3',
-        }
+        return _OPENSHMEM_FLAGS
     
     @classmethod
-    def get_berkeley_upc_flags(cls) -> Dict[str, str]:
+    def get_berkeley_upc_flags(cls) -> Mapping[str, str]:
         """Get Berkeley UPC compilation flags"""
-        return {
-            'UPCC': str(cls.BUPC_COMPILER),
-            'UPCRUN': str(cls.BUPC_RUN),
-            'UPCC_FLAGS': '-O3',
-        }
+        return _BERKELEY_UPC_FLAGS
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _prefix_entries(cls) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """Names in HOMEBREW_PREFIX and HOMEBREW_PREFIX/bin
+        
+        Every install directory and compiler checked below lives in one of
+        these two directories, so two directory reads replace a stat per
+        path (which adds up on NFS-mounted prefixes). Cached for the
+        process; call PGASConfig._prefix_entries.cache_clear() after
+        installing a library.
+        """
+        def entries(path: Path) -> FrozenSet[str]:
+            try:
+                return frozenset(os.listdir(path))
+            except OSError:
+                return frozenset()
+        
+        return entries(cls.HOMEBREW_PREFIX), entries(cls.HOMEBREW_PREFIX / "bin")
     
     @classmethod
     def check_installation(cls) -> Dict[str, bool]:
         """Check which PGAS libraries are installed"""
+        dirs, bins = cls._prefix_entries()
         return {
-            'GASNet': cls.GASNET_INSTALL.exists(),
-            'UPC++': cls.UPCXX_COMPILER.exists(),
-            'OpenSHMEM': cls.OSHCC.exists(),
-            'Berkeley UPC': cls.BUPC_COMPILER.exists(),
+            'GASNet': cls.GASNET_INSTALL.name in dirs,
+            'UPC++': cls.UPCXX_COMPILER.name in bins,
+            'OpenSHMEM': cls.OSHCC.name in bins,
+            'Berkeley UPC': cls.BUPC_COMPILER.name in bins,
         }
     
     @classmethod
-    def get_library_info(cls, library: str) -> Optional[Dict[str, str]]:
+    def get_library_info(cls, library: str) -> Optional[Mapping[str, str]]:
         """Get detailed information about a PGAS library"""
-        info_map = {
-            'upcxx': {
-                'name': 'UPC++',
-                'version': cls.UPCXX_VERSION,
-                'install_dir': str(cls.UPCXX_INSTALL),
-                'compiler': str(cls.UPCXX_COMPILER),
-                'runtime': str(cls.UPCXX_RUN),
-            },
-            'openshmem': {
-                'name': 'OpenSHMEM (SOS)',
-                'version': cls.OPENSHMEM_VERSION,
-                'install_dir': str(cls.OPENSHMEM_INSTALL),
-                'compiler': str(cls.OSHCC),
-                'runtime': str(cls.OSHRUN),
-            },
-            'gasnet': {
-                'name': 'GASNet-EX',
-                'version': cls.GASNET_VERSION,
-                'install_dir': str(cls.GASNET_INSTALL),
-            },
-            'berkeley_upc': {
-                'name': 'Berkeley UPC',
-                'version': cls.BERKELEY_UPC_VERSION,
-                'install_dir': str(cls.BERKELEY_UPC_INSTALL),
-                'compiler': str(cls.BUPC_COMPILER),
-                'runtime': str(cls.BUPC_RUN),
-            }
-        }
-        return info_map.get(library.lower())
+        return _INFO_MAP.get(library.lower())
     
     @classmethod
-    def get_all_compilers(cls) -> Dict[str, Path]:
+    def get_all_compilers(cls) -> Mapping[str, Path]:
         """Get all PGAS compiler paths"""
-        return {
-            'upcxx': cls.UPCXX_COMPILER,
-            'oshcc': cls.OSHCC,
-            'oshc++': cls.OSHCXX,
-            'upcc': cls.BUPC_COMPILER,
-        }
+        return _ALL_COMPILERS
     
     @classmethod
     def get_env_vars(cls) -> Dict[str, str]:
         """Get environment variables for PGAS libraries"""
         env = {}
+        dirs, _ = cls._prefix_entries()
         
-        if cls.UPCXX_INSTALL.exists():
+        if cls.UPCXX_INSTALL.name in dirs:
             env['UPCXX_INSTALL'] = str(cls.UPCXX_INSTALL)
             env['PATH'] = f"{cls.UPCXX_INSTALL / 'bin'}:$PATH"
         
-        if cls.OPENSHMEM_INSTALL.exists():
+        if cls.OPENSHMEM_INSTALL.name in dirs:
             env['OPENSHMEM_INSTALL'] = str(cls.OPENSHMEM_INSTALL)
             env['LD_LIBRARY_PATH'] = f"{cls.OPENSHMEM_INSTALL / 'lib'}:$LD_LIBRARY_PATH"
         
-        if cls.GASNET_INSTALL.exists():
+        if cls.GASNET_INSTALL.name in dirs:
             env['GASNET_INSTALL'] = str(cls.GASNET_INSTALL)
         
         return env
 
 
+_UPCXX_FLAGS = MappingProxyType({
+    'UPCXX': str(PGASConfig.UPCXX_COMPILER),
+    'UPCXX_RUN': str(PGASConfig.UPCXX_RUN),
+    'UPCXX_FLAGS': '-O3 -std=c++23',
+})
+
+_OPENSHMEM_FLAGS = MappingProxyType({
+    'OSHCC': str(PGASConfig.OSHCC),
+    'OSHCXX': str(PGASConfig.OSHCXX),
+    'OSHRUN': str(PGASConfig.OSHRUN),
+    'OSHCC_FLAGS': '-std=c++23 -O3',
+})
+
+_BERKELEY_UPC_FLAGS = MappingProxyType({
+    'UPCC': str(PGASConfig.BUPC_COMPILER),
+    'UPCRUN': str(PGASConfig.BUPC_RUN),
+    'UPCC_FLAGS': '-O3',
+})
+
+_INFO_MAP = MappingProxyType({
+    'upcxx': MappingProxyType({
+        'name': 'UPC++',
+        'version': PGASConfig.UPCXX_VERSION,
+        'install_dir': str(PGASConfig.UPCXX_INSTALL),
+        'compiler': str(PGASConfig.UPCXX_COMPILER),
+        'runtime': str(PGASConfig.UPCXX_RUN),
+    }),
+    'openshmem': MappingProxyType({
+        'name': 'OpenSHMEM (SOS)',
+        'version': PGASConfig.OPENSHMEM_VERSION,
+        'install_dir': str(PGASConfig.OPENSHMEM_INSTALL),
+        'compiler': str(PGASConfig.OSHCC),
+        'runtime': str(PGASConfig.OSHRUN),
+    }),
+    'gasnet': MappingProxyType({
+        'name': 'GASNet-EX',
+        'version': PGASConfig.GASNET_VERSION,
+        'install_dir': str(PGASConfig.GASNET_INSTALL),
+    }),
+    'berkeley_upc': MappingProxyType({
+        'name': 'Berkeley UPC',
+        'version': PGASConfig.BERKELEY_UPC_VERSION,
+        'install_dir': str(PGASConfig.BERKELEY_UPC_INSTALL),
+        'compiler': str(PGASConfig.BUPC_COMPILER),
+        'runtime': str(PGASConfig.BUPC_RUN),
+    }),
+})
+
+_ALL_COMPILERS = MappingProxyType({
+    'upcxx': PGASConfig.UPCXX_COMPILER,
+    'oshcc': PGASConfig.OSHCC,
+    'oshc++': PGASConfig.OSHCXX,
+    'upcc': PGASConfig.BUPC_COMPILER,
+})
+
+
 if __name__ == '__main__':
     print("PGAS Library Configuration")
     print("=" * 60)
@@ -187,7 +187,11 @@ class ClusterSetup:
             print(f"\n{'='*70}")
             print("STEP 2: Homebrew, GCC, and Binutils")
             print(f"{'='*70}")
-            self.homebrew_mgr.install_and_configure_local()
+            if self.password:
+                # Workers are set up over SSH concurrently with this node
+                self.homebrew_mgr.install_and_configure_cluster()
+            else:
+                self.homebrew_mgr.install_and_configure_local()
             
             # STEP 3: System Configuration (THIRD - hosts file, PATH)
             print(f"\n{'='*70}")
@@ -40,16 +40,11 @@ if not mgr.configure_openshmem():
     print("Failed to configure")
     exit(1)
 
-# Build
+# Build and install
 if not mgr.build_openshmem(num_jobs=8):
     print("Failed to build")
     exit(1)
 
-# Install
-if not mgr.install_openshmem():
-    print("Failed to install")
-    exit(1)
-
 # Create symlinks
 mgr.create_openshmem_symlinks()
 